@@ -0,0 +1,199 @@
+"""
+End-to-end benchmark of a coordinator cycle against the local STF stand-in.
+
+Starts `benchmarks.stf_server`, points the integration's endpoints at it and
+drives `SmartThingsFindCoordinator.async_refresh` for a number of cycles with
+10, 100 and 1000 simulated devices. Reports per device count:
+
+  - cycle latency (p50 / p99 / max)
+  - requests per cycle, by endpoint
+  - peak traced memory during a cycle and the memory blocks still allocated
+    after it (measured in separate cycles, as tracing slows everything down)
+  - failed device updates and failed cycles
+
+Run from the repository root, in an environment with Home Assistant installed:
+
+    python -m benchmarks.bench_coordinator
+    python -m benchmarks.bench_coordinator --devices 100 --cycles 50 --latency-ms 150 --error-rate 0.02
+    python -m benchmarks.bench_coordinator --active --settle 1 --rps 20
+
+The request limits default to values that don't throttle the stand-in, so the
+numbers show the integration's own overhead; pass `--rps`/`--concurrency` to
+benchmark with the limits used in production.
+"""
+import argparse
+import asyncio
+import gc
+import inspect
+import logging
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from types import MappingProxyType
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartthings_find import SmartThingsFindCoordinator, _get_store, utils
+from custom_components.smartthings_find.const import (
+    DOMAIN,
+    CONF_JSESSIONID,
+    CONF_ACTIVE_MODE_SMARTTAGS,
+    CONF_ACTIVE_MODE_OTHERS,
+    CONF_ACTIVE_SETTLE_DELAY,
+    CONF_ADAPTIVE_POLLING,
+    CONF_INCREMENTAL_UPDATES,
+)
+from custom_components.smartthings_find.utils import (
+    STFRequestEngine,
+    STFSessionManager,
+    create_stf_session,
+    create_device_descriptor,
+)
+
+from benchmarks.stf_server import STFStandIn, add_server_arguments, server_config_from_args
+
+
+def point_at(base_url: str) -> None:
+    """Send the integration's requests to the stand-in instead of Samsung."""
+    utils.URL_GET_CSRF = f"{base_url}/chkLogin.do"
+    utils.URL_DEVICE_LIST = f"{base_url}/device/getDeviceList.do"
+    utils.URL_REQUEST_LOC_UPDATE = f"{base_url}/dm/addOperation.do"
+    utils.URL_SET_LAST_DEVICE = f"{base_url}/device/setLastSelect.do"
+
+
+def make_config_entry(options: dict) -> ConfigEntry:
+    """Create a config entry, whatever arguments this Home Assistant version requires."""
+    kwargs = {
+        "domain": DOMAIN,
+        "title": "Benchmark",
+        "data": {CONF_JSESSIONID: "benchmark"},
+        "source": "user",
+        "version": 1,
+        "minor_version": 1,
+        "options": options,
+        "unique_id": None,
+        "discovery_keys": MappingProxyType({}),
+        "subentries_data": None,
+    }
+    params = inspect.signature(ConfigEntry.__init__).parameters
+    return ConfigEntry(**{k: v for k, v in kwargs.items() if k in params})
+
+
+def percentile(values: list[float], q: float) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def bench(args: argparse.Namespace, num_devices: int) -> None:
+    server = STFStandIn(server_config_from_args(args, num_devices))
+    point_at(await server.start())
+
+    config_dir = tempfile.TemporaryDirectory(prefix="stf-bench-")
+    hass = HomeAssistant(config_dir.name)
+    entry = make_config_entry({
+        CONF_ADAPTIVE_POLLING: args.adaptive,
+        CONF_INCREMENTAL_UPDATES: not args.no_incremental,
+        CONF_ACTIVE_SETTLE_DELAY: args.settle,
+    })
+    hass.data[DOMAIN] = {entry.entry_id: {
+        CONF_ACTIVE_MODE_SMARTTAGS: args.active,
+        CONF_ACTIVE_MODE_OTHERS: args.active,
+    }}
+    session = STFSessionManager(STFRequestEngine(
+        create_stf_session("benchmark", max_connections=args.concurrency),
+        max_concurrency=args.concurrency,
+        requests_per_second=args.rps,
+    ))
+    devices = [create_device_descriptor(d) for d in server.device_list]
+    coordinator = SmartThingsFindCoordinator(
+        hass, session, devices, args.interval, entry, _get_store(hass, entry.entry_id))
+    # Entities listen for updates in a real setup; one listener per device
+    # makes the incremental updates do their work
+    for device in devices:
+        coordinator.async_add_device_listener(device.dev_id, lambda: None)
+
+    try:
+        # Warm-up: CSRF token, connections, first result of each device
+        await coordinator.async_refresh()
+
+        latencies = []
+        requests = Counter()
+        failed_devices = 0
+        failed_cycles = 0
+        for _ in range(args.cycles):
+            before = Counter(server.counts)
+            start = time.perf_counter()
+            await coordinator.async_refresh()
+            latencies.append(time.perf_counter() - start)
+            requests.update(server.counts - before)
+            if not coordinator.last_update_success:
+                failed_cycles += 1
+            else:
+                failed_devices += sum(1 for r in coordinator.data.values() if not r.update_success)
+
+        peaks = []
+        retained = []
+        if not args.no_memory:
+            gc.collect()
+            tracemalloc.start()
+            for _ in range(args.memory_cycles):
+                tracemalloc.reset_peak()
+                base, _ = tracemalloc.get_traced_memory()
+                blocks = _traced_blocks()
+                await coordinator.async_refresh()
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - base)
+                retained.append(_traced_blocks() - blocks)
+            tracemalloc.stop()
+    finally:
+        await session.close()
+        await server.stop()
+        await hass.async_stop(force=True)
+        config_dir.cleanup()
+
+    cycles = len(latencies)
+    per_cycle = {k: v / cycles for k, v in sorted(requests.items())}
+    print(f"--- {num_devices} devices, {cycles} cycles ---")
+    print(
+        f"  cycle latency:  p50 {percentile(latencies, 50) * 1000:8.1f} ms, "
+        f"p99 {percentile(latencies, 99) * 1000:8.1f} ms, max {max(latencies) * 1000:8.1f} ms")
+    print(f"  requests/cycle: {sum(per_cycle.values()):.1f} " + " ".join(f"{k}={v:.1f}" for k, v in per_cycle.items()))
+    if peaks:
+        print(
+            f"  memory/cycle:   peak {statistics.median(peaks) / 1024:8.1f} KiB, "
+            f"retained blocks {statistics.median(retained):+.0f}")
+    print(f"  failures:       {failed_devices} device updates, {failed_cycles} cycles")
+
+
+def _traced_blocks() -> int:
+    return sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--memory-cycles", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the memory measurement")
+    parser.add_argument("--interval", type=int, default=120, help="Update interval of the coordinator")
+    parser.add_argument("--active", action="store_true", help="Request location updates (active mode)")
+    parser.add_argument("--settle", type=int, default=0, help="Settle delay after requesting location updates")
+    parser.add_argument("--adaptive", action="store_true", help="Enable adaptive polling")
+    parser.add_argument("--no-incremental", action="store_true", help="Disable incremental updates")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rps", type=float, default=10000)
+    parser.add_argument("--debug", action="store_true")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.CRITICAL)
+    for num_devices in args.devices:
+        asyncio.run(bench(args, num_devices))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Micro-benchmark of the operation parser.
+
+Compares `parse_operations` against the location-selection loop (plus
+`get_battery_level` and `get_sub_location`) used by `get_device_location`
+in version 0.2.4, on setLastSelect.do payloads with many operations.
+
+Run from the repository root, in an environment with Home Assistant installed:
+
+    python -m benchmarks.bench_parser
+    python -m benchmarks.bench_parser --ops 50 200 --payload recorded.json
+
+`--payload` takes recorded setLastSelect.do responses (a single response
+object or a list of them); otherwise synthetic payloads are generated.
+"""
+import argparse
+import json
+import random
+import timeit
+from datetime import datetime, timedelta, timezone
+
+import pytz
+
+from custom_components.smartthings_find.const import BATTERY_LEVELS
+from custom_components.smartthings_find.parser import parse_operations
+
+
+# --- Payloads ---------------------------------------------------------------
+
+def _stf_date(dt: datetime) -> str:
+    return dt.strftime("%Y%m%d%H%M%S")
+
+
+def make_payload(num_ops: int, seed: int = 0) -> dict:
+    """Generate a setLastSelect.do response shaped like the recorded ones."""
+    rnd = random.Random(seed)
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    ops = [{"oprnType": "CHECK_CONNECTION", "battery": rnd.choice(list(BATTERY_LEVELS))}]
+    for i in range(num_ops - 1):
+        date = _stf_date(now - timedelta(minutes=rnd.randint(0, 60 * 24 * 7)))
+        lat = 48.1 + rnd.random() / 100
+        lon = 11.5 + rnd.random() / 100
+        kind = rnd.random()
+        if kind < 0.5:
+            ops.append({
+                "oprnType": rnd.choice(["LOCATION", "LASTLOC"]),
+                "latitude": str(lat),
+                "longitude": str(lon),
+                "horizontalUncertainty": str(rnd.randint(5, 100)),
+                "verticalUncertainty": str(rnd.randint(5, 100)),
+                "extra": {"gpsUtcDt": date},
+            })
+        elif kind < 0.7:
+            ops.append({
+                "oprnType": "OFFLINE_LOC",
+                "encLocation": {"encrypted": True, "data": "x" * 64},
+            })
+        elif kind < 0.9:
+            ops.append({
+                "oprnType": "OFFLINE_LOC",
+                "encLocation": {
+                    "latitude": str(lat),
+                    "longitude": str(lon),
+                    "horizontalUncertainty": str(rnd.randint(5, 100)),
+                    "verticalUncertainty": str(rnd.randint(5, 100)),
+                    "gpsUtcDt": date,
+                },
+            })
+        else:
+            ops.append({
+                "oprnType": "LOCATION",
+                "encLocation": {
+                    side: {
+                        "latitude": str(lat),
+                        "longitude": str(lon),
+                        "horizontalUncertainty": "10",
+                        "verticalUncertainty": "10",
+                        "gpsUtcDt": date,
+                    }
+                    for side in ("left", "right")
+                },
+            })
+    rnd.shuffle(ops)
+    return {"operation": ops}
+
+
+def load_payloads(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+# --- Legacy implementation (before the parser module) ------------------------
+
+def _legacy_parse_stf_date(datestr: str) -> datetime:
+    return datetime.strptime(datestr, "%Y%m%d%H%M%S").replace(tzinfo=pytz.UTC)
+
+
+def _legacy_calc_gps_accuracy(hu, vu):
+    try:
+        return round((float(hu)**2 + float(vu)**2) ** 0.5, 1)
+    except (TypeError, ValueError):
+        return None
+
+
+def _legacy_battery(ops):
+    for op in ops:
+        if op['oprnType'] == 'CHECK_CONNECTION' and 'battery' in op:
+            batt_raw = op['battery']
+            batt = BATTERY_LEVELS.get(batt_raw, None)
+            if batt is None:
+                try:
+                    batt = int(batt_raw)
+                except ValueError:
+                    pass
+            return batt
+    return None
+
+
+def _legacy_sub_location(ops, side):
+    for op in ops:
+        if side in op.get('encLocation', {}):
+            loc = op['encLocation'][side]
+            return op, {
+                "latitude": float(loc['latitude']),
+                "longitude": float(loc['longitude']),
+                "gps_accuracy": _legacy_calc_gps_accuracy(loc.get('horizontalUncertainty'), loc.get('verticalUncertainty')),
+                "gps_date": _legacy_parse_stf_date(loc['gpsUtcDt'])
+            }
+    return {}, {}
+
+
+def legacy_parse(data: dict):
+    used_op = None
+    used_loc = {"latitude": None, "longitude": None, "gps_accuracy": None, "gps_date": None}
+    for op in data['operation']:
+        if op['oprnType'] in ['LOCATION', 'LASTLOC', 'OFFLINE_LOC']:
+            if 'latitude' in op:
+                if 'extra' in op and 'gpsUtcDt' in op['extra']:
+                    utcDate = _legacy_parse_stf_date(op['extra']['gpsUtcDt'])
+                else:
+                    json.dumps(op)
+                    continue
+                if used_loc['gps_date'] and used_loc['gps_date'] >= utcDate:
+                    continue
+                used_loc['latitude'] = float(op['latitude'])
+                if 'longitude' in op:
+                    used_loc['longitude'] = float(op['longitude'])
+                used_loc['gps_accuracy'] = _legacy_calc_gps_accuracy(
+                    op.get('horizontalUncertainty'), op.get('verticalUncertainty'))
+                used_loc['gps_date'] = utcDate
+                used_op = op
+            elif 'encLocation' in op:
+                loc = op['encLocation']
+                if 'encrypted' in loc and loc['encrypted']:
+                    continue
+                elif 'gpsUtcDt' not in loc:
+                    continue
+                utcDate = _legacy_parse_stf_date(loc['gpsUtcDt'])
+                if used_loc['gps_date'] and used_loc['gps_date'] >= utcDate:
+                    continue
+                if 'latitude' in loc:
+                    used_loc['latitude'] = float(loc['latitude'])
+                if 'longitude' in loc:
+                    used_loc['longitude'] = float(loc['longitude'])
+                used_loc['gps_accuracy'] = _legacy_calc_gps_accuracy(
+                    loc.get('horizontalUncertainty'), loc.get('verticalUncertainty'))
+                used_loc['gps_date'] = utcDate
+                used_op = op
+    battery = _legacy_battery(data['operation'])
+    subs = {side: _legacy_sub_location(data['operation'], side)[1] for side in ("left", "right")}
+    return used_op, used_loc, battery, subs
+
+
+def new_parse(data: dict):
+    return parse_operations("bench", data['operation'])
+
+
+# --- Runner -----------------------------------------------------------------
+
+def check(payload: dict) -> None:
+    """Make sure both implementations pick the same main fix and battery."""
+    used_op, used_loc, battery, _ = legacy_parse(payload)
+    parsed = new_parse(payload)
+    assert parsed.battery == battery, (parsed.battery, battery)
+    if used_op is None:
+        assert parsed.location is None
+    else:
+        assert parsed.location.gps_date == used_loc['gps_date']
+        assert parsed.location.latitude == used_loc['latitude']
+
+
+def bench(name: str, payloads: list[dict], repeat: int, number: int) -> None:
+    for payload in payloads:
+        check(payload)
+    results = {}
+    for label, func in (("legacy", legacy_parse), ("parser", new_parse)):
+        timer = timeit.Timer(lambda: [func(p) for p in payloads])
+        best = min(timer.repeat(repeat=repeat, number=number)) / (number * len(payloads))
+        results[label] = best
+    print(
+        f"{name:>24}: legacy {results['legacy'] * 1e6:9.1f} µs/payload, "
+        f"parser {results['parser'] * 1e6:9.1f} µs/payload, "
+        f"speedup {results['legacy'] / results['parser']:5.1f}x"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, nargs="+", default=[10, 50, 200, 1000],
+                        help="Number of operations per synthetic payload")
+    parser.add_argument("--payload", help="JSON file with recorded setLastSelect.do responses")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.payload:
+        bench(args.payload, load_payloads(args.payload), args.repeat, args.number)
+    for num_ops in args.ops:
+        payloads = [make_payload(num_ops, seed) for seed in range(10)]
+        bench(f"{num_ops} ops", payloads, args.repeat, max(1, args.number * 10 // num_ops))
+
+
+if __name__ == "__main__":
+    main()
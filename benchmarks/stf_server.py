@@ -0,0 +1,214 @@
+"""
+Local stand-in for the SmartThings Find endpoints used by the integration.
+
+Serves `chkLogin.do`, `device/getDeviceList.do`, `dm/addOperation.do` and
+`device/setLastSelect.do` with synthetic data, so the integration can be
+exercised without a Samsung account and without hitting Samsung's servers.
+Latency, error rate (5xx), throttling (429) and expired sessions ('Logout')
+can be configured to see how the integration copes with them.
+
+Used by `benchmarks.bench_coordinator`, but can also be run on its own:
+
+    python -m benchmarks.stf_server --devices 100 --port 8080 --latency-ms 80
+"""
+import argparse
+import asyncio
+import random
+import socket
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+
+from aiohttp import web
+
+from benchmarks.bench_parser import make_payload
+
+DEVICE_TYPES = ("TAG", "TAG", "PHONE", "TABLET", "WATCH", "CANAL2")
+
+
+@dataclass
+class ServerConfig:
+    """Behaviour of the stand-in server."""
+
+    devices: int = 10
+    # Operations in each setLastSelect.do response
+    ops_per_device: int = 10
+    # Distinct payloads per device; responses cycle through them
+    payload_variants: int = 4
+    # "constant", "uniform" (0..2x) or "lognormal" around the median
+    latency: str = "lognormal"
+    latency_ms: float = 50
+    latency_sigma: float = 0.5
+    # Fraction of requests answered with 500, 429 or 401 'Logout'
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    logout_rate: float = 0.0
+    # Retry-After sent with 429 and 5xx responses (seconds), None for none
+    retry_after: float | None = 0
+    seed: int = 0
+
+
+class STFStandIn:
+    """aiohttp server answering like SmartThings Find, with request counters."""
+
+    def __init__(self, config: ServerConfig):
+        self.config = config
+        self.counts: Counter = Counter()
+        self._rnd = random.Random(config.seed)
+        self._csrf = uuid.uuid4().hex
+        self._runner: web.AppRunner | None = None
+        self._served: Counter = Counter()
+        self.device_list = [self._make_device(i) for i in range(config.devices)]
+        self._payloads = {
+            d["dvceID"]: [
+                make_payload(config.ops_per_device, seed=config.seed * 100003 + i * 31 + v)
+                for v in range(config.payload_variants)
+            ]
+            for i, d in enumerate(self.device_list)
+        }
+
+        self.app = web.Application()
+        self.app.router.add_get("/chkLogin.do", self._chk_login)
+        self.app.router.add_post("/device/getDeviceList.do", self._device_list)
+        self.app.router.add_post("/dm/addOperation.do", self._add_operation)
+        self.app.router.add_post("/device/setLastSelect.do", self._set_last_select)
+
+    def _make_device(self, i: int) -> dict:
+        type_code = DEVICE_TYPES[i % len(DEVICE_TYPES)]
+        return {
+            "dvceID": f"bench-{i:05d}",
+            "modelName": f"Bench {type_code.title()} {i}",
+            "modelID": f"SM-B{i:04d}",
+            "deviceTypeCode": type_code,
+            "subType": "CANAL2" if type_code == "CANAL2" else None,
+            "usrId": "bench-user",
+            "icons": {"coloredIcon": f"https://example.invalid/{type_code.lower()}.png"},
+        }
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the base URL."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.SockSite(self._runner, sock).start()
+        return f"http://{host}:{sock.getsockname()[1]}"
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _delay(self) -> None:
+        cfg = self.config
+        if cfg.latency_ms <= 0:
+            return
+        if cfg.latency == "constant":
+            ms = cfg.latency_ms
+        elif cfg.latency == "uniform":
+            ms = self._rnd.uniform(0, 2 * cfg.latency_ms)
+        else:
+            ms = self._rnd.lognormvariate(0, cfg.latency_sigma) * cfg.latency_ms
+        await asyncio.sleep(ms / 1000)
+
+    async def _fault(self, endpoint: str) -> web.Response | None:
+        """Count the request, wait the latency and return a fault response if one is due."""
+        self.counts[endpoint] += 1
+        await self._delay()
+        cfg = self.config
+        headers = {"Retry-After": str(cfg.retry_after)} if cfg.retry_after is not None else None
+        roll = self._rnd.random()
+        if roll < cfg.logout_rate:
+            self.counts["logout"] += 1
+            return web.Response(status=401, text="Logout")
+        roll -= cfg.logout_rate
+        if roll < cfg.throttle_rate:
+            self.counts["429"] += 1
+            return web.Response(status=429, headers=headers)
+        roll -= cfg.throttle_rate
+        if roll < cfg.error_rate:
+            self.counts["5xx"] += 1
+            return web.Response(status=500, headers=headers)
+        return None
+
+    async def _chk_login(self, request: web.Request) -> web.Response:
+        if fault := await self._fault("chkLogin"):
+            return fault
+        return web.Response(text="", headers={"_csrf": self._csrf})
+
+    async def _device_list(self, request: web.Request) -> web.Response:
+        if fault := await self._fault("getDeviceList"):
+            return fault
+        return web.json_response({"deviceList": self.device_list})
+
+    async def _add_operation(self, request: web.Request) -> web.Response:
+        if fault := await self._fault("addOperation"):
+            return fault
+        return web.Response(text="")
+
+    async def _set_last_select(self, request: web.Request) -> web.Response:
+        if fault := await self._fault("setLastSelect"):
+            return fault
+        dev_id = (await request.json()).get("dvceId")
+        payloads = self._payloads.get(dev_id)
+        if payloads is None:
+            return web.Response(status=400, text="Unknown device")
+        index = self._served[dev_id] % len(payloads)
+        self._served[dev_id] += 1
+        return web.json_response(payloads[index])
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options of ServerConfig (except the device count) to a parser."""
+    parser.add_argument("--ops", type=int, default=10, help="Operations per setLastSelect.do response")
+    parser.add_argument("--latency", choices=("constant", "uniform", "lognormal"), default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Median response latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Sigma of the lognormal latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--logout-rate", type=float, default=0.0, help="Fraction of 401 'Logout' responses")
+    parser.add_argument("--retry-after", type=float, default=0, help="Retry-After of 429/5xx responses (-1: none)")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def server_config_from_args(args: argparse.Namespace, devices: int) -> ServerConfig:
+    return ServerConfig(
+        devices=devices,
+        ops_per_device=args.ops,
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        logout_rate=args.logout_rate,
+        retry_after=args.retry_after if args.retry_after >= 0 else None,
+        seed=args.seed,
+    )
+
+
+async def _serve(config: ServerConfig, host: str, port: int) -> None:
+    server = STFStandIn(config)
+    url = await server.start(host, port)
+    print(f"Serving {config.devices} devices on {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(server_config_from_args(args, args.devices), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,21 @@
+from dataclasses import replace
 from datetime import timedelta, datetime, timezone
 import asyncio
 import logging
-import aiohttp
-from homeassistant.core import HomeAssistant
+import time
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, CALLBACK_TYPE, ServiceCall, ServiceResponse, SupportsResponse, callback
 from homeassistant.helpers.typing import ConfigType
-from homeassistant.const import Platform
+from homeassistant.const import ATTR_DEVICE_ID, Platform
+from homeassistant.helpers import config_validation as cv, device_registry, entity_registry
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.exceptions import ConfigEntryAuthFailed, HomeAssistantError, ServiceValidationError
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
@@ -18,19 +26,158 @@ from .const import (
     CONF_ACTIVE_MODE_SMARTTAGS,
     CONF_ACTIVE_MODE_SMARTTAGS_DEFAULT,
     CONF_UPDATE_INTERVAL,
-    CONF_UPDATE_INTERVAL_DEFAULT
+    CONF_UPDATE_INTERVAL_DEFAULT,
+    CONF_ADAPTIVE_POLLING,
+    CONF_ADAPTIVE_POLLING_DEFAULT,
+    CONF_INCREMENTAL_UPDATES,
+    CONF_INCREMENTAL_UPDATES_DEFAULT,
+    CONF_MAX_CONCURRENCY,
+    CONF_MAX_CONCURRENCY_DEFAULT,
+    CONF_REQUESTS_PER_SECOND,
+    CONF_REQUESTS_PER_SECOND_DEFAULT,
+    CONF_ACTIVE_SETTLE_DELAY,
+    CONF_ACTIVE_SETTLE_DELAY_DEFAULT,
+    CONF_ACTIVE_MIN_AGE,
+    CONF_ACTIVE_MIN_AGE_DEFAULT,
+    CONF_VERBOSE_ATTRIBUTES,
+    CONF_VERBOSE_ATTRIBUTES_DEFAULT,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_HEARTBEAT_INTERVAL_DEFAULT,
+    CONF_STALE_WINDOW,
+    CONF_STALE_WINDOW_DEFAULT,
+    CONF_HISTORY_SIZE,
+    CONF_HISTORY_SIZE_DEFAULT,
+    CYCLE_DEADLINE,
+    DATA_HUB,
+    REFRESH_DEVICE_COALESCE,
+    SERVICE_REFRESH_DEVICE,
+    SERVICE_GET_HISTORY,
+    SIGNAL_SUB_DEVICE_ADDED,
+    SUB_DEVICE_SIDES,
+    STORAGE_VERSION,
+    STORAGE_SAVE_DELAY,
+    HISTORY_STORAGE_VERSION,
+    HISTORY_SAVE_DELAY
 )
-from .utils import fetch_csrf, get_devices, get_device_location, create_stf_session
+from .utils import (
+    get_devices,
+    get_device_location,
+    request_location_update,
+    is_active_mode,
+    create_stf_session,
+    create_device_descriptor,
+    STFRequestEngine,
+    STFSessionManager
+)
+from .scheduler import DevicePollScheduler, DeviceCircuitBreaker
+from .catalogue import DeviceCatalogue
+from .metrics import CycleMetrics
+from .history import LocationHistory
+from .hub import STFHub, async_get_hub
+from .models import DeviceDescriptor, DeviceResult, LocationFix
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = [Platform.DEVICE_TRACKER, Platform.BUTTON, Platform.SENSOR]
 
+# Takes a target: devices, entities or areas
+REFRESH_DEVICE_SCHEMA = cv.make_entity_service_schema({})
+
+GET_HISTORY_SCHEMA = vol.Schema({
+    vol.Required(ATTR_DEVICE_ID): cv.string,
+    vol.Optional("start"): cv.datetime,
+    vol.Optional("end"): cv.datetime,
+    vol.Optional("limit"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+})
+
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the SmartThings Find component."""
-    hass.data[DOMAIN] = {}
+    # Shared by all config entries (accounts); a config flow may have created it already
+    async_get_hub(hass)
+
+    async def async_handle_refresh_device(call: ServiceCall) -> None:
+        """Refresh the location of the targeted devices right away."""
+        refreshes = []
+        for device_id in _get_target_devices(hass, call):
+            try:
+                coordinator, dev_id = _resolve_device(hass, device_id)
+            except ServiceValidationError:
+                # Devices of other integrations in a targeted area
+                continue
+            # The service device of an entry has no location
+            if any(d.dev_id == dev_id for d in coordinator.devices):
+                refreshes.append(_async_refresh_device(coordinator, dev_id))
+        if not refreshes:
+            raise ServiceValidationError("No SmartThings Find device was targeted")
+        await asyncio.gather(*refreshes)
+
+    async def async_handle_get_history(call: ServiceCall) -> ServiceResponse:
+        """Return the fixes of a device's location history within a time range."""
+        coordinator, dev_id = _resolve_device(hass, call.data[ATTR_DEVICE_ID])
+        if not coordinator.history_size:
+            raise ServiceValidationError("The location history is disabled in the options")
+        start = call.data.get("start")
+        end = call.data.get("end")
+        history = coordinator.history.get(dev_id)
+        fixes = history.query(
+            dt_util.as_utc(start) if start else None,
+            dt_util.as_utc(end) if end else None,
+            call.data.get("limit")
+        ) if history else []
+        return {
+            "fixes": [
+                {
+                    "time": fix.gps_date.isoformat(),
+                    "latitude": fix.latitude,
+                    "longitude": fix.longitude,
+                    "gps_accuracy": fix.accuracy,
+                }
+                for fix in fixes
+            ]
+        }
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_REFRESH_DEVICE, async_handle_refresh_device, schema=REFRESH_DEVICE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_GET_HISTORY, async_handle_get_history, schema=GET_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY
+    )
     return True
 
+def _get_target_devices(hass: HomeAssistant, call: ServiceCall) -> set[str]:
+    """Return the Home Assistant devices targeted by a service call, directly or through their entities or areas."""
+    selected = async_extract_referenced_entity_ids(hass, call)
+    device_ids = set(selected.referenced_devices)
+    ent_reg = entity_registry.async_get(hass)
+    for entity_id in selected.referenced | selected.indirectly_referenced:
+        ent = ent_reg.async_get(entity_id)
+        if ent and ent.platform == DOMAIN and ent.device_id:
+            device_ids.add(ent.device_id)
+    return device_ids
+
+def _resolve_device(hass: HomeAssistant, device_id: str) -> tuple["SmartThingsFindCoordinator", str]:
+    """Return the coordinator and dvceID of a Home Assistant device."""
+    ha_dev = device_registry.async_get(hass).async_get(device_id)
+    if ha_dev is None:
+        raise ServiceValidationError(f"Unknown device: {device_id}")
+    dev_id = next((ident for domain, ident in ha_dev.identifiers if domain == DOMAIN), None)
+    for entry_id in ha_dev.config_entries:
+        coordinator = hass.data[DOMAIN].get(entry_id, {}).get("coordinator")
+        if dev_id and coordinator:
+            return coordinator, dev_id
+    raise ServiceValidationError(f"Device '{ha_dev.name}' is not a loaded SmartThings Find device")
+
+async def _async_refresh_device(coordinator: "SmartThingsFindCoordinator", dev_id: str) -> DeviceResult:
+    """Refresh a single device, translating errors for service calls and button presses."""
+    try:
+        return await coordinator.async_refresh_device(dev_id)
+    except KeyError:
+        raise ServiceValidationError(f"Device {dev_id} is not in the device list (anymore)")
+    except ConfigEntryAuthFailed as err:
+        coordinator.config_entry.async_start_reauth(coordinator.hass)
+        raise HomeAssistantError(f"Authentication failed: {err}") from err
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up SmartThings Find from a config entry."""
     
@@ -41,66 +188,187 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     #   - the cookie jar is isolated from other integrations
     #   - the JSESSIONID cookie is properly scoped to smartthingsfind.samsung.com
     #   - a browser User-Agent is sent so Samsung doesn't reject requests as bots
+    # All requests go through a request engine which limits concurrency and
+    # rate, so accounts with many devices don't hit Samsung in bursts. The
+    # session manager on top of it owns the CSRF token.
+    # Connection pool and a host-wide rate budget are shared with the other
+    # accounts through the hub.
+    hub: STFHub = hass.data[DOMAIN][DATA_HUB]
     jsessionid = entry.data[CONF_JSESSIONID]
-    session = create_stf_session(jsessionid)
+    max_concurrency = entry.options.get(CONF_MAX_CONCURRENCY, CONF_MAX_CONCURRENCY_DEFAULT)
+    session = STFSessionManager(STFRequestEngine(
+        create_stf_session(jsessionid, connector=hub.connector),
+        max_concurrency=max_concurrency,
+        requests_per_second=entry.options.get(CONF_REQUESTS_PER_SECOND, CONF_REQUESTS_PER_SECOND_DEFAULT),
+        shared_bucket=hub.bucket,
+    ))
 
-    active_smarttags = entry.options.get(CONF_ACTIVE_MODE_SMARTTAGS, CONF_ACTIVE_MODE_SMARTTAGS_DEFAULT)
-    active_others = entry.options.get(CONF_ACTIVE_MODE_OTHERS, CONF_ACTIVE_MODE_OTHERS_DEFAULT)
+    update_interval = entry.options.get(CONF_UPDATE_INTERVAL, CONF_UPDATE_INTERVAL_DEFAULT)
+    hub.register(entry.entry_id, session.engine, update_interval)
 
-    hass.data[DOMAIN][entry.entry_id].update({
-        CONF_ACTIVE_MODE_SMARTTAGS:  active_smarttags,
-        CONF_ACTIVE_MODE_OTHERS: active_others,
-    })
+    try:
+        active_smarttags = entry.options.get(CONF_ACTIVE_MODE_SMARTTAGS, CONF_ACTIVE_MODE_SMARTTAGS_DEFAULT)
+        active_others = entry.options.get(CONF_ACTIVE_MODE_OTHERS, CONF_ACTIVE_MODE_OTHERS_DEFAULT)
 
-    # This raises ConfigEntryAuthFailed-exception if failed. So if we
-    # can continue after fetch_csrf, we know that authentication was ok
-    await fetch_csrf(hass, session, entry.entry_id)
+        hass.data[DOMAIN][entry.entry_id].update({
+            CONF_ACTIVE_MODE_SMARTTAGS:  active_smarttags,
+            CONF_ACTIVE_MODE_OTHERS: active_others,
+        })
 
-    # Log session age so we can empirically learn how long JSESSIONID stays valid
-    session_created_at = entry.data.get(CONF_SESSION_CREATED_AT)
-    if session_created_at:
-        created = datetime.fromisoformat(session_created_at)
-        age = datetime.now(timezone.utc) - created
-        _LOGGER.info(
-            f"Session age: {age.days}d {age.seconds // 3600}h "
-            f"(authenticated at {created.strftime('%Y-%m-%d %H:%M UTC')})"
+        # Log session age so we can empirically learn how long JSESSIONID stays valid
+        session_created_at = entry.data.get(CONF_SESSION_CREATED_AT)
+        if session_created_at:
+            created = datetime.fromisoformat(session_created_at)
+            age = datetime.now(timezone.utc) - created
+            _LOGGER.info(
+                f"Session age: {age.days}d {age.seconds // 3600}h "
+                f"(authenticated at {created.strftime('%Y-%m-%d %H:%M UTC')})"
+            )
+        else:
+            _LOGGER.info("Session age unknown (no timestamp stored yet)")
+
+        # Device list and last results of the previous run, if any
+        store = _get_store(hass, entry.entry_id)
+        stored = await store.async_load()
+
+        if stored and stored.get("devices"):
+            # Create the entities right away from the stored state and do the
+            # (slow) authentication, device list and first refresh in the
+            # background, so Home Assistant's startup doesn't wait for it
+            devices = [create_device_descriptor(d) for d in stored["devices"]]
+            coordinator = SmartThingsFindCoordinator(hass, session, devices, update_interval, entry, store)
+            coordinator.async_restore_data(stored.get("results") or {})
+            await coordinator.async_load_history()
+            _LOGGER.debug(f"Restored {len(devices)} devices from storage")
+        else:
+            # First start: nothing to show yet, so do everything up front.
+            # This raises ConfigEntryAuthFailed-exception if failed. So if we
+            # can continue after fetching the CSRF token, we know that
+            # authentication was ok
+            await session.async_refresh_token()
+
+            # Load all SmartThings-Find devices from the users account
+            devices = await get_devices(
+                hass, session, entry.options.get(CONF_VERBOSE_ATTRIBUTES, CONF_VERBOSE_ATTRIBUTES_DEFAULT))
+
+            # Create an update coordinator. This is responsible to regularly
+            # fetch data from STF and update the device_tracker and sensor
+            # entities
+            coordinator = SmartThingsFindCoordinator(hass, session, devices, update_interval, entry, store)
+            await coordinator.async_load_history()
+
+            # This is what makes the first setup slow (around 10-15 seconds for
+            # 15 devices). Only if it succeeds, the integration will be marked
+            # as successfully loaded.
+            await coordinator.async_config_entry_first_refresh()
+
+        # Keeps the device list up to date, adding and removing entities in place
+        catalogue = DeviceCatalogue(hass, entry, coordinator)
+
+        hass.data[DOMAIN][entry.entry_id].update({
+            CONF_JSESSIONID: jsessionid,
+            "session": session,
+            "coordinator": coordinator,
+            "catalogue": catalogue
+        })
+
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    except Exception:
+        # Unload isn't called for an entry that failed to set up, so don't
+        # leak its session, and the hub's connection pool with the last entry
+        hass.data[DOMAIN].pop(entry.entry_id, None)
+        await session.close()
+        await hub.async_unregister(entry.entry_id)
+        raise
+
+    catalogue.async_start()
+
+    heartbeat_interval = entry.options.get(CONF_HEARTBEAT_INTERVAL, CONF_HEARTBEAT_INTERVAL_DEFAULT)
+    if heartbeat_interval:
+        _async_start_heartbeat(hass, entry, session, heartbeat_interval)
+
+    if stored and stored.get("devices"):
+        entry.async_create_background_task(
+            hass, _async_finish_setup(hass, entry, coordinator), f"{DOMAIN}_finish_setup_{entry.entry_id}"
         )
+    return True
+
+async def _async_finish_setup(hass: HomeAssistant, entry: ConfigEntry, coordinator: "SmartThingsFindCoordinator") -> None:
+    """Authenticate, check the device list and run the first live refresh after a restored start."""
+    try:
+        await coordinator.session.async_refresh_token()
+        devices = await get_devices(hass, coordinator.session, coordinator.keep_raw)
+    except ConfigEntryAuthFailed as err:
+        _LOGGER.warning(f"Authentication failed after restoring state: {err}")
+        entry.async_start_reauth(hass)
+        return
+    except Exception as err:
+        # The session manager fetches a CSRF token with the next request
+        _LOGGER.warning(f"Failed to fetch device list, using the stored one: {err}")
     else:
-        _LOGGER.info("Session age unknown (no timestamp stored yet)")
-    
-    # Load all SmartThings-Find devices from the users account
-    devices = await get_devices(hass, session, entry.entry_id)
-    
-    # Create an update coordinator. This is responsible to regularly
-    # fetch data from STF and update the device_tracker and sensor
-    # entities
-    update_interval = entry.options.get(CONF_UPDATE_INTERVAL, CONF_UPDATE_INTERVAL_DEFAULT)
-    coordinator = SmartThingsFindCoordinator(hass, session, devices, update_interval, entry)
+        if devices:
+            hass.data[DOMAIN][entry.entry_id]["catalogue"].async_apply(devices)
 
-    # This is what makes the whole integration slow to load (around 10-15
-    # seconds for my 15 devices) but it is the right way to do it. Only if
-    # it succeeds, the integration will be marked as successfully loaded.
-    await coordinator.async_config_entry_first_refresh()
-    
-    hass.data[DOMAIN][entry.entry_id].update({
-        CONF_JSESSIONID: jsessionid,
-        "session": session,
-        "coordinator": coordinator,
-        "devices": devices
-    })
-
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-    return True
+    await coordinator.async_refresh()
+
+@callback
+def _async_start_heartbeat(hass: HomeAssistant, entry: ConfigEntry, session: STFSessionManager, interval: int) -> None:
+    """
+    Ping STF regularly while no other requests are sent, so the server session
+    doesn't time out between (adaptive) polls and force a reauth.
+    """
+    async def _async_heartbeat(now: datetime) -> None:
+        try:
+            await session.async_heartbeat(interval)
+        except ConfigEntryAuthFailed as err:
+            _LOGGER.warning(
+                f"Session expired (lifetime: {_format_lifetime(entry, session.expired_at) or 'unknown'}): {err}")
+            entry.async_start_reauth(hass)
+        except Exception as err:
+            # Network problems don't tell us anything about the session
+            _LOGGER.debug(f"Session heartbeat failed: {err}")
+
+    entry.async_on_unload(
+        async_track_time_interval(hass, _async_heartbeat, timedelta(seconds=interval))
+    )
+
+def _format_lifetime(entry: ConfigEntry, until: datetime | None) -> str | None:
+    """Return the time between authentication and `until` as "<days>d <hours>h"."""
+    session_created_at = entry.data.get(CONF_SESSION_CREATED_AT)
+    if not session_created_at or not until:
+        return None
+    age = until - datetime.fromisoformat(session_created_at)
+    return f"{age.days}d {age.seconds // 3600}h"
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored state of a deleted config entry."""
+    await _get_store(hass, entry.entry_id).async_remove()
+    await _get_history_store(hass, entry.entry_id).async_remove()
+
+def _get_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store holding the device list and last results of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
+def _get_history_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store holding the location history of the devices of a config entry."""
+    return Store(hass, HISTORY_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.history")
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_success = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_success:
         entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        # Write pending (delayed) saves now. Otherwise they could fire after
+        # a reload and overwrite the stores of the new coordinator.
+        coordinator: SmartThingsFindCoordinator = entry_data.get("coordinator")
+        if coordinator:
+            await coordinator.async_save()
+            await coordinator.async_save_history()
         # Close the dedicated session we created for this entry
-        session: aiohttp.ClientSession = entry_data.get("session")
+        session: STFSessionManager = entry_data.get("session")
         if session and not session.closed:
             await session.close()
+        await hass.data[DOMAIN][DATA_HUB].async_unregister(entry.entry_id)
     else:
         _LOGGER.error(f"Unload failed: {unload_success}")
     return unload_success
@@ -109,44 +377,112 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
     """Return diagnostics for a config entry (Settings → Devices & Services → Download Diagnostics)."""
     session_created_at = entry.data.get(CONF_SESSION_CREATED_AT)
-    session_age = None
-    if session_created_at:
-        created = datetime.fromisoformat(session_created_at)
-        age = datetime.now(timezone.utc) - created
-        session_age = f"{age.days}d {age.seconds // 3600}h"
+    session_age = _format_lifetime(entry, datetime.now(timezone.utc))
 
     coordinator: SmartThingsFindCoordinator = (
         hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get("coordinator")
     )
+    session: STFSessionManager = (
+        hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get("session")
+    )
+    hub: STFHub | None = hass.data.get(DOMAIN, {}).get(DATA_HUB)
 
     return {
         "session": {
             "authenticated_at": session_created_at,
             "session_age": session_age,
+            # Observed lifetime, from authentication until the session was found expired
+            "lifetime": _format_lifetime(entry, session.expired_at) if session else None,
+            **(session.session_info() if session else {}),
         },
         "devices": [
             {
-                "name": d["data"].get("modelName"),
-                "id": d["data"].get("dvceID"),
-                "type": d["data"].get("deviceTypeCode"),
-                "model": d["data"].get("modelID"),
+                "name": d.name,
+                "id": d.dev_id,
+                "type": d.type_code,
+                "model": d.model_id,
+                "poll_interval": _get_poll_interval(coordinator, d.dev_id),
+                "motion_tier": coordinator.get_motion_tier(d.dev_id),
+                "success_rate": coordinator.metrics.success_rate(d.dev_id),
+                "breaker": coordinator.breaker.as_dict(d.dev_id),
+                "history_fixes": len(coordinator.history.get(d.dev_id) or ()),
             }
-            for d in hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get("devices", [])
+            for d in (coordinator.devices if coordinator else [])
         ],
         "last_coordinator_update": (
             coordinator.last_update_success if coordinator else None
         ),
+        "requests": session.stats() if session else None,
+        # Load of all accounts on SmartThings Find
+        "hub": hub.as_dict(entry.entry_id) if hub else None,
+        "metrics": {
+            "cycles": coordinator.metrics.as_dict() if coordinator else None,
+            "endpoints": session.engine.metrics.as_dict() if session else None,
+        },
     }
 
 
+def _default_sub_devices(device: DeviceDescriptor) -> set[str]:
+    """Return the parts of a device that get entities before they report a location."""
+    return set(SUB_DEVICE_SIDES) if device.sub_type == 'CANAL2' else set()
+
+
+def _get_poll_interval(coordinator, dev_id: str) -> float | None:
+    """Return the current adaptive poll interval (seconds) of a device, if any."""
+    if not coordinator or not coordinator.scheduler:
+        return None
+    schedule = coordinator.scheduler.get_schedule(dev_id)
+    return schedule.interval if schedule else None
+
+
 class SmartThingsFindCoordinator(DataUpdateCoordinator):
     """Class to manage fetching SmartThings Find data."""
 
-    def __init__(self, hass: HomeAssistant, session: aiohttp.ClientSession, devices, update_interval: int, config_entry: ConfigEntry):
+    def __init__(self, hass: HomeAssistant, session: STFSessionManager, devices: list[DeviceDescriptor], update_interval: int, config_entry: ConfigEntry, store: Store):
         """Initialize the coordinator."""
         self.session = session
         self.devices = devices
         self.hass = hass
+        # Device list and last results are persisted, so the next start
+        # doesn't have to wait for STF
+        self.store = store
+        # With adaptive polling, each cycle only fetches the devices that are
+        # due; the others keep their previous result
+        adaptive_polling = config_entry.options.get(CONF_ADAPTIVE_POLLING, CONF_ADAPTIVE_POLLING_DEFAULT)
+        self.scheduler = DevicePollScheduler(update_interval) if adaptive_polling else None
+        # With incremental updates, each device's result is pushed to its
+        # entities as soon as it arrives instead of after the whole cycle
+        self.incremental_updates = config_entry.options.get(CONF_INCREMENTAL_UPDATES, CONF_INCREMENTAL_UPDATES_DEFAULT)
+        # Seconds between requesting location updates and fetching the locations
+        self.settle_delay = config_entry.options.get(CONF_ACTIVE_SETTLE_DELAY, CONF_ACTIVE_SETTLE_DELAY_DEFAULT)
+        # Devices with a fix younger than this (seconds) aren't woken up in active mode
+        self.active_min_age = config_entry.options.get(CONF_ACTIVE_MIN_AGE, CONF_ACTIVE_MIN_AGE_DEFAULT)
+        # Keep the raw API payload of devices and results and show it in the
+        # state attributes (for debugging only)
+        self.keep_raw = config_entry.options.get(CONF_VERBOSE_ATTRIBUTES, CONF_VERBOSE_ATTRIBUTES_DEFAULT)
+        self._device_listeners: dict[str, list[CALLBACK_TYPE]] = {}
+        self._streamed: set[str] = set()
+        # Whether the running refresh is one of the regular, scheduled ones
+        self._scheduled_refresh = False
+        # Cycle durations and success rates, for the diagnostic sensors
+        self.metrics = CycleMetrics()
+        # Devices that fail every cycle are paused
+        self.breaker = DeviceCircuitBreaker()
+        # Seconds a device's last good result is shown (marked stale) after
+        # its updates started failing, so single failures don't make its
+        # entities flap between available and unavailable
+        self.stale_window = config_entry.options.get(CONF_STALE_WINDOW, CONF_STALE_WINDOW_DEFAULT)
+        self._last_good: dict[str, DeviceResult] = {}
+        # On-demand refreshes of single devices, with their start time
+        self._device_refreshes: dict[str, tuple[float, asyncio.Task]] = {}
+        # Distinct fixes of each device, for the get_history service; kept
+        # in a store of their own, as they change more than the rest
+        self.history_size = config_entry.options.get(CONF_HISTORY_SIZE, CONF_HISTORY_SIZE_DEFAULT)
+        self.history: dict[str, LocationHistory] = {}
+        self.history_store = _get_history_store(hass, config_entry.entry_id)
+        # Parts of multi-part devices (e.g. earbuds, their case) that have
+        # entities of their own, by device
+        self.sub_devices: dict[str, set[str]] = {d.dev_id: _default_sub_devices(d) for d in devices}
         super().__init__(
             hass,
             _LOGGER,
@@ -155,41 +491,374 @@ class SmartThingsFindCoordinator(DataUpdateCoordinator):
             update_interval=timedelta(seconds=update_interval)  # Update interval for all entities
         )
 
+    @callback
+    def async_add_device_listener(self, dev_id: str, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Listen for results of a single device. Returns a function to remove the listener."""
+        listeners = self._device_listeners.setdefault(dev_id, [])
+        listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_update_device_listeners(self, dev_id: str) -> None:
+        """Push the current data of a single device to its entities."""
+        for update_callback in list(self._device_listeners.get(dev_id, [])):
+            update_callback()
+
+    def is_streamed(self, dev_id: str) -> bool:
+        """Return True if the device's result of this cycle was already pushed to its entities."""
+        return dev_id in self._streamed
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all listeners, then forget which devices were streamed this cycle."""
+        super().async_update_listeners()
+        self._streamed.clear()
+
+    @callback
+    def async_set_devices(self, devices: list[DeviceDescriptor]) -> None:
+        """Replace the device list, dropping the data of devices that are gone."""
+        self.devices = devices
+        known = {d.dev_id for d in devices}
+        self.sub_devices = {d.dev_id: self.sub_devices.get(d.dev_id) or _default_sub_devices(d) for d in devices}
+        if self.data:
+            for dev_id in [dev_id for dev_id in self.data if dev_id not in known]:
+                del self.data[dev_id]
+                self._last_good.pop(dev_id, None)
+                self.history.pop(dev_id, None)
+                self.breaker.forget(dev_id)
+                self.metrics.forget(dev_id)
+                if self.scheduler:
+                    self.scheduler.forget(dev_id)
+        for dev_id in [dev_id for dev_id in self._device_refreshes if dev_id not in known]:
+            del self._device_refreshes[dev_id]
+        self.store.async_delay_save(self._data_to_store, STORAGE_SAVE_DELAY)
+
+    @callback
+    def async_restore_data(self, results: dict) -> None:
+        """Use results stored by a previous run until the first live refresh."""
+        known = {d.dev_id for d in self.devices}
+        self.data = {
+            dev_id: DeviceResult.from_storage(result)
+            for dev_id, result in results.items()
+            if dev_id in known
+        }
+        self._last_good = {
+            dev_id: replace(result, stale=False)
+            for dev_id, result in self.data.items()
+            if result.update_success
+        }
+        for dev_id, result in self.data.items():
+            self.sub_devices[dev_id] |= result.sub_locations.keys()
+
+    def _data_to_store(self) -> dict:
+        """Return the device list and last results in their stored form."""
+        return {
+            "devices": [d.to_storage() for d in self.devices],
+            "results": {dev_id: result.to_storage() for dev_id, result in (self.data or {}).items()},
+        }
+
+    async def async_load_history(self) -> None:
+        """Load the location history stored by a previous run (or remove it, if disabled)."""
+        if not self.history_size:
+            await self.history_store.async_remove()
+            return
+        stored = await self.history_store.async_load() or {}
+        known = {d.dev_id for d in self.devices}
+        self.history = {
+            dev_id: LocationHistory.from_storage(data, self.history_size)
+            for dev_id, data in (stored.get("devices") or {}).items()
+            if dev_id in known
+        }
+
+    def _history_to_store(self) -> dict:
+        """Return the location history in its stored form."""
+        return {"devices": {dev_id: history.to_storage() for dev_id, history in self.history.items()}}
+
+    async def async_save_history(self) -> None:
+        """Persist the location history now."""
+        if self.history_size:
+            await self.history_store.async_save(self._history_to_store())
+
+    async def async_save(self) -> None:
+        """Persist the device list and last results now."""
+        await self.store.async_save(self._data_to_store())
+
+    async def async_refresh_device(self, dev_id: str) -> DeviceResult:
+        """
+        Request a new location of a single device and fetch it (active mode),
+        outside of the regular cycles.
+
+        Calls for the same device while a refresh is running, or shortly
+        after, share that refresh.
+
+        Args:
+            dev_id (str): The dvceID of the device.
+
+        Returns:
+            DeviceResult: The result now shown for the device.
+
+        Raises:
+            KeyError: If the device is not known.
+            ConfigEntryAuthFailed: If the session is not valid anymore.
+        """
+        running = self._device_refreshes.get(dev_id)
+        if running:
+            started, task = running
+            if not task.done() or (
+                time.monotonic() - started < REFRESH_DEVICE_COALESCE
+                and not task.cancelled() and task.exception() is None
+            ):
+                return await asyncio.shield(task)
+
+        device = next((d for d in self.devices if d.dev_id == dev_id), None)
+        if device is None:
+            raise KeyError(dev_id)
+        task = self.hass.async_create_task(self._async_refresh_device(device))
+        self._device_refreshes[dev_id] = (time.monotonic(), task)
+        return await asyncio.shield(task)
+
+    async def _async_refresh_device(self, device: DeviceDescriptor) -> DeviceResult:
+        """Refresh a single device and push its result to its entities."""
+        _LOGGER.debug(f"[{device.name}] Refreshing on demand")
+        if self.scheduler:
+            self.scheduler.record_active_request(device.dev_id, datetime.now(timezone.utc))
+        if await request_location_update(self.session, device) and self.settle_delay:
+            await asyncio.sleep(self.settle_delay)
+        result = await get_device_location(
+            self.session, device, self.keep_raw, bool(self.history_size), self._history_newest(device.dev_id))
+        # The user asked for it, so this also probes a paused device; only
+        # a success changes its breaker, a failure keeps the backoff
+        result = self._record_result(device, result, datetime.now(timezone.utc), manual=True)
+        if self.data is None:
+            self.data = {}
+        self.data[device.dev_id] = result
+        self.async_update_device_listeners(device.dev_id)
+        self.store.async_delay_save(self._data_to_store, STORAGE_SAVE_DELAY)
+        return result
+
+    def _record_result(self, device: DeviceDescriptor, result: DeviceResult, now: datetime, manual: bool = False) -> DeviceResult:
+        """Feed a device's new result to metrics, breaker and scheduler and return the result to show."""
+        dev_id = device.dev_id
+        self.metrics.record_device(dev_id, result.update_success)
+        self.breaker.record(device, result.update_success, now, manual)
+        if self.scheduler:
+            self.scheduler.record(device, result, now)
+        if self.history_size and result.fixes:
+            self._record_history(dev_id, result.fixes)
+        if result.sub_locations:
+            self._add_sub_devices(device, result)
+        return self._keep_last_good(dev_id, result, now)
+
+    def _add_sub_devices(self, device: DeviceDescriptor, result: DeviceResult) -> None:
+        """Announce the parts of a device that reported a location for the first time, so they get entities."""
+        sub_devices = self.sub_devices.setdefault(device.dev_id, set())
+        new_parts = result.sub_locations.keys() - sub_devices
+        if not new_parts:
+            return
+        sub_devices |= new_parts
+        for part in sorted(new_parts):
+            _LOGGER.info(f"[{device.name}] Found new part '{part}'")
+            async_dispatcher_send(
+                self.hass, SIGNAL_SUB_DEVICE_ADDED.format(self.config_entry.entry_id), device, part)
+
+    def _record_history(self, dev_id: str, fixes: tuple[LocationFix, ...]) -> None:
+        """Add the new ones of a device's fixes to its location history."""
+        history = self.history.get(dev_id)
+        if history is None:
+            history = self.history[dev_id] = LocationHistory(self.history_size)
+        if history.extend(fixes):
+            self.history_store.async_delay_save(self._history_to_store, HISTORY_SAVE_DELAY)
+
+    def _history_newest(self, dev_id: str) -> datetime | None:
+        """Return the date of the newest fix in a device's history; older fixes needn't be parsed."""
+        history = self.history.get(dev_id)
+        return history.newest if history is not None else None
+
+    def get_motion_tier(self, dev_id: str) -> str | None:
+        """Return the motion tier of a device, None without adaptive polling or before its first fix."""
+        schedule = self.scheduler.get_schedule(dev_id) if self.scheduler else None
+        return schedule.tier if schedule else None
+
+    def _has_fresh_fix(self, dev_id: str, now: datetime) -> bool:
+        """Return True if the device's newest fix is younger than active_min_age."""
+        result = self.data.get(dev_id) if self.data else None
+        fix = result.location if result else None
+        if not fix or not fix.gps_date:
+            return False
+        return (now - fix.gps_date).total_seconds() < self.active_min_age
+
+    def _keep_last_good(self, dev_id: str, result: DeviceResult, now: datetime) -> DeviceResult:
+        """Return the result to show for a device: the new one, or the last good one within the stale window."""
+        if result.update_success:
+            self._last_good[dev_id] = result
+            return result
+        last_good = self._last_good.get(dev_id)
+        if last_good and self._is_within_stale_window(last_good, now):
+            return replace(last_good, stale=True)
+        return result
+
+    def _is_within_stale_window(self, result: DeviceResult, now: datetime) -> bool:
+        """Return True if the (last good) result may still be shown."""
+        return (
+            result.fetched_at is not None
+            and (now - result.fetched_at).total_seconds() <= self.stale_window
+        )
+
+    async def _async_refresh(self, log_failures: bool = True, raise_on_auth_failed: bool = False,
+                             scheduled: bool = False, raise_on_entry_error: bool = False) -> None:
+        """Remember whether the refresh is a scheduled one, for _async_update_data."""
+        self._scheduled_refresh = scheduled
+        try:
+            await super()._async_refresh(log_failures, raise_on_auth_failed, scheduled, raise_on_entry_error)
+        finally:
+            self._scheduled_refresh = False
+
     async def _async_update_data(self):
         """Fetch data from SmartThings Find."""
+        # With several accounts, scheduled cycles wait until it's this one's
+        # turn. The first refresh and requested ones run right away.
+        hub: STFHub | None = self.hass.data.get(DOMAIN, {}).get(DATA_HUB)
+        if hub:
+            await hub.async_wait_turn(self.config_entry.entry_id, wait=self._scheduled_refresh)
+        self._streamed.clear()
+        start = time.monotonic()
         try:
-            _LOGGER.debug("Updating locations...")
-            results = await asyncio.gather(
-                *(
-                    get_device_location(self.hass, self.session, device['data'], self.config_entry.entry_id)
-                    for device in self.devices
-                ),
-                return_exceptions=True,
-            )
-            # Auth failures must propagate before we do anything else
-            for result in results:
-                if isinstance(result, ConfigEntryAuthFailed):
-                    raise result
-            tags = {}
-            for device, result in zip(self.devices, results):
-                dev_id = device['data']['dvceID']
-                if isinstance(result, Exception):
-                    # Shouldn't happen after our get_device_location fix, but be safe
-                    _LOGGER.error("Unexpected error fetching '%s': %s", device['data'].get('modelName'), result)
-                    tags[dev_id] = {
-                        "dev_name": device['data'].get('modelName'),
-                        "dev_id": dev_id,
-                        "update_success": False,
-                        "location_found": False,
-                        "used_op": None,
-                        "used_loc": None,
-                        "ops": [],
-                    }
-                else:
+            now = datetime.now(timezone.utc)
+            if self.scheduler:
+                due = self.scheduler.due_devices(self.devices, now)
+            else:
+                due = self.devices
+            due = [d for d in due if self.breaker.allow(d.dev_id, now)]
+            _LOGGER.debug("Updating locations of %d/%d devices...", len(due), len(self.devices))
+
+            # Phase 1: ask all devices in active mode for a location update at
+            # once, then give them a single settle delay to report back. This
+            # way the locations fetched in phase 2 are the ones we asked for,
+            # instead of showing up only one interval later.
+            # Devices with a fresh fix, and (with adaptive polling) devices
+            # whose motion tier doesn't call for a wakeup yet, are only read
+            # passively, which saves requests and the batteries of the devices
+            active = []
+            for device in due:
+                if not is_active_mode(self.hass, device, self.config_entry.entry_id):
+                    continue
+                if self._has_fresh_fix(device.dev_id, now):
+                    self.metrics.skipped_wakeups += 1
+                    continue
+                if self.scheduler and not self.scheduler.is_active_due(device.dev_id, now):
+                    self.metrics.tier_skipped_wakeups += 1
+                    continue
+                active.append(device)
+            # Nothing may stall the cycle beyond its deadline
+            deadline = start + CYCLE_DEADLINE
+            if active:
+                _LOGGER.debug("Requesting location updates of %d devices...", len(active))
+                requests = [
+                    asyncio.create_task(request_location_update(self.session, device))
+                    for device in active
+                ]
+                if self.scheduler:
+                    for device in active:
+                        self.scheduler.record_active_request(device.dev_id, now)
+                done, not_done = await asyncio.wait(requests, timeout=CYCLE_DEADLINE)
+                for task in not_done:
+                    task.cancel()
+                # Auth failures must propagate before we do anything else
+                for task in done:
+                    if isinstance(task.exception(), ConfigEntryAuthFailed):
+                        raise task.exception()
+                if self.settle_delay:
+                    await asyncio.sleep(min(self.settle_delay, max(deadline - time.monotonic(), 0)))
+
+            # Phase 2: collect the locations of all due devices
+            # Devices that were not due keep their result from the previous cycle
+            tags = dict(self.data) if self.data else {}
+            # Only stream while the last cycle succeeded. Otherwise the entities
+            # are unavailable anyway and become available with the full result.
+            streaming = self.incremental_updates and self.data is not None and self.last_update_success
+
+            polled = set()
+            # Devices may be removed while the cycle runs; their results are dropped
+            devices, known = self.devices, {d.dev_id for d in self.devices}
+            pending = {
+                asyncio.create_task(
+                    get_device_location(
+                        self.session, device, self.keep_raw, bool(self.history_size),
+                        self._history_newest(device.dev_id))
+                ): device
+                for device in due
+            }
+            try:
+                while pending:
+                    done, _ = await asyncio.wait(
+                        pending, timeout=max(deadline - time.monotonic(), 0), return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        # Not recorded anywhere, so these devices are due again next cycle
+                        _LOGGER.warning(
+                            f"Cycle took longer than {CYCLE_DEADLINE}s; "
+                            f"{len(pending)} devices keep their previous result")
+                        break
+                    if self.devices is not devices:
+                        devices, known = self.devices, {d.dev_id for d in self.devices}
+                    for task in done:
+                        device = pending.pop(task)
+                        dev_id = device.dev_id
+                        if dev_id not in known:
+                            # Still fetch the result, so a failure isn't logged as never retrieved
+                            if not task.cancelled():
+                                task.exception()
+                            continue
+                        try:
+                            tags[dev_id] = task.result()
+                        except ConfigEntryAuthFailed:
+                            # Auth failures must propagate before we do anything else
+                            raise
+                        except Exception as err:
+                            # Shouldn't happen after our get_device_location fix, but be safe
+                            _LOGGER.error("Unexpected error fetching '%s': %s", device.name, err)
+                            tags[dev_id] = DeviceResult(dev_id=dev_id, dev_name=device.name)
+                        tags[dev_id] = self._record_result(device, tags[dev_id], now)
+                        polled.add(dev_id)
+                        if streaming:
+                            self.data[dev_id] = tags[dev_id]
+                            self._streamed.add(dev_id)
+                            self.async_update_device_listeners(dev_id)
+            finally:
+                for task in pending:
+                    task.cancel()
+
+            # Devices that weren't polled in this cycle keep their current
+            # result, which may have been refreshed on demand meanwhile
+            for dev_id, result in (self.data or {}).items():
+                if dev_id not in polled and dev_id in tags:
                     tags[dev_id] = result
-            _LOGGER.debug("Fetched %d locations", len(tags))
+            known = {d.dev_id for d in self.devices}
+            for dev_id in [dev_id for dev_id in tags if dev_id not in known]:
+                del tags[dev_id]
+
+            # Stale results of devices that weren't polled (paused by the
+            # breaker) are only shown until the stale window runs out
+            for dev_id, result in tags.items():
+                if result.stale and not self._is_within_stale_window(result, now):
+                    _LOGGER.info(f"[{result.dev_name}] No update within {self.stale_window}s; rendering state unavailable")
+                    tags[dev_id] = DeviceResult(dev_id=dev_id, dev_name=result.dev_name)
+
+            duration = time.monotonic() - start
+            self.metrics.record_cycle(duration, len(due))
+            _LOGGER.debug("Fetched %d locations in %.1fs", len(due), duration)
+            # Writes are delayed and coalesced, so this is cheap to call every cycle
+            self.store.async_delay_save(self._data_to_store, STORAGE_SAVE_DELAY)
             return tags
         except ConfigEntryAuthFailed:
+            # The failed cycle makes all entities unavailable, including the
+            # ones whose result was already streamed
+            self._streamed.clear()
             raise
         except Exception as err:
-            raise UpdateFailed(f"Error fetching data: {err}")
\ No newline at end of file
+            self._streamed.clear()
+            raise UpdateFailed(f"Error fetching data: {err}")
@@ -1,62 +1,98 @@
 import logging
 from homeassistant.components.button import ButtonEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
 from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN
-from .utils import fetch_csrf
+from .const import DOMAIN, SIGNAL_DEVICE_ADDED
+from .entity import STFDeviceEntity
+from .models import DeviceDescriptor
+from .utils import URL_REQUEST_LOC_UPDATE
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback) -> None:
     """Set up SmartThings Find button entities."""
-    devices = hass.data[DOMAIN][entry.entry_id]["devices"]
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
     entities = []
-    for device in devices:
-        entities += [RingButton(hass, device)]
+    for device in coordinator.devices:
+        entities += [RingButton(hass, device), LocateButton(coordinator, device)]
     async_add_entities(entities)
 
+    @callback
+    def async_add_device(device: DeviceDescriptor) -> None:
+        """Add the entities of a device that was added to the account."""
+        async_add_entities([RingButton(hass, device), LocateButton(coordinator, device)])
 
-class RingButton(ButtonEntity):
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_DEVICE_ADDED.format(entry.entry_id), async_add_device)
+    )
+
+
+class RingButton(STFDeviceEntity, ButtonEntity):
     """Representation a button entity to make a SmartThings Find device ring."""
 
-    def __init__(self, hass: HomeAssistant, device):
-        """Initialize the button."""
-        self._attr_unique_id = f"stf_ring_button_{device['data']['dvceID']}"
-        self._attr_name = f"{device['data']['modelName']} Ring"
+    _name_suffix = "Ring"
+    _use_device_picture = True
 
-        if 'icons' in device['data'] and 'coloredIcon' in device['data']['icons']:
-            self._attr_entity_picture = device['data']['icons']['coloredIcon']
+    def __init__(self, hass: HomeAssistant, device: DeviceDescriptor):
+        """Initialize the button."""
+        self._attr_unique_id = f"stf_ring_button_{device.dev_id}"
         self._attr_icon = 'mdi:nfc-search-variant'
-        self.device = device['data']
-        self._attr_device_info = device['ha_dev_info']
+        self._set_device(device)
 
     async def async_press(self):
         """Handle the button press."""
         entry_id = self.registry_entry.config_entry_id
         session = self.hass.data[DOMAIN][entry_id]["session"]
-        csrf_token = self.hass.data[DOMAIN][entry_id]["_csrf"]
         ring_payload = {
-            "dvceId": self.device['dvceID'],
+            "dvceId": self.device.dev_id,
             "operation": "RING",
-            "usrId": self.device['usrId'],
+            "usrId": self.device.usr_id,
             "status": "start",
             "lockMessage": "Home Assistant is ringing your device!"
         }
-        url = f"https://smartthingsfind.samsung.com/dm/addOperation.do?_csrf={
-            csrf_token}"
 
         try:
-            async with session.post(url, json=ring_payload) as response:
+            # The session manager refreshes the CSRF token if needed; otherwise
+            # the request isn't retried, a resent one would ring the device again
+            async with session.post(URL_REQUEST_LOC_UPDATE, json=ring_payload, retry=False) as response:
                 _LOGGER.debug("HTTP response status: %s", response.status)
                 if response.status == 200:
-                    _LOGGER.info(f"Successfully rang device {self.device['modelName']}")
+                    _LOGGER.info(f"Successfully rang device {self.device.name}")
                     _LOGGER.debug(f"Response: {await response.text()}")
                 else:
-                    # Fetch a new CSRF token to make sure we're still logged in
-                    await fetch_csrf(self.hass, session, entry_id)
+                    _LOGGER.warning(f"Failed to ring device {self.device.name} ({response.status})")
+        except Exception as e:
+            _LOGGER.error(f"Exception occurred while ringing '{self.device.name}': %s", e)
+
+
+class LocateButton(STFDeviceEntity, ButtonEntity):
+    """Button entity to fetch a fresh location of a single device right away."""
+
+    _name_suffix = "Locate now"
+
+    def __init__(self, coordinator, device: DeviceDescriptor):
+        """Initialize the button."""
+        self._attr_unique_id = f"stf_locate_button_{device.dev_id}"
+        self._attr_icon = 'mdi:crosshairs-gps'
+        self.coordinator = coordinator
+        self._set_device(device)
+
+    async def async_press(self):
+        """Handle the button press."""
+        try:
+            result = await self.coordinator.async_refresh_device(self.device.dev_id)
+        except ConfigEntryAuthFailed as e:
+            _LOGGER.warning(f"Authentication failed while locating '{self.device.name}': {e}")
+            self.coordinator.config_entry.async_start_reauth(self.hass)
+            return
         except Exception as e:
-            _LOGGER.error(f"Exception occurred while ringing '{self.device['modelName']}': %s", e)
+            _LOGGER.error(f"Exception occurred while locating '{self.device.name}': %s", e)
+            return
+        if not result.update_success or result.stale:
+            _LOGGER.warning(f"Failed to locate device {self.device.name}")
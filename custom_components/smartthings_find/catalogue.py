@@ -0,0 +1,106 @@
+import json
+import logging
+from datetime import datetime
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers import device_registry
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import (
+    DOMAIN,
+    CATALOGUE_REFRESH_INTERVAL,
+    SIGNAL_DEVICE_ADDED,
+    SIGNAL_DEVICE_UPDATED
+)
+from .models import DeviceDescriptor
+from .utils import get_devices
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _content_hash(device: DeviceDescriptor) -> int:
+    """Hash of everything we use from a device list entry (all of it, if it is kept)."""
+    return hash(json.dumps(device.raw if device.raw is not None else device.to_storage(), sort_keys=True))
+
+
+class DeviceCatalogue:
+    """
+    Keeps the device list of a config entry up to date without reloading it.
+
+    The device list is fetched on a slow timer and diffed against the known
+    one by dvceID and content hash. Entities of new devices are added and
+    devices that disappeared from the account are removed from the device
+    registry (which removes their entities), all in place.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, coordinator):
+        """Initialize the catalogue with the devices the coordinator already knows."""
+        self.hass = hass
+        self.entry = entry
+        self.coordinator = coordinator
+        self._hashes = {d.dev_id: _content_hash(d) for d in coordinator.devices}
+
+    @callback
+    def async_start(self) -> None:
+        """Refresh the catalogue periodically until the config entry is unloaded."""
+        self.entry.async_on_unload(
+            async_track_time_interval(self.hass, self.async_refresh, CATALOGUE_REFRESH_INTERVAL)
+        )
+
+    async def async_refresh(self, now: datetime | None = None) -> None:
+        """Fetch the device list and apply the differences."""
+        try:
+            devices = await get_devices(self.hass, self.coordinator.session, self.coordinator.keep_raw)
+        except ConfigEntryAuthFailed as err:
+            _LOGGER.warning(f"Authentication failed while refreshing the device list: {err}")
+            self.entry.async_start_reauth(self.hass)
+            return
+        except Exception as err:
+            _LOGGER.warning(f"Failed to refresh the device list: {err}")
+            return
+        if not devices:
+            # An empty list is more likely a hiccup than an empty account
+            _LOGGER.debug("Received empty device list; keeping the known devices")
+            return
+        self.async_apply(devices)
+
+    @callback
+    def async_apply(self, devices: list[DeviceDescriptor]) -> None:
+        """Add, update and remove devices so the known devices match `devices`."""
+        entry_id = self.entry.entry_id
+        hashes = {d.dev_id: _content_hash(d) for d in devices}
+        added = [d for d in devices if d.dev_id not in self._hashes]
+        changed = [d for d in devices if d.dev_id in self._hashes and self._hashes[d.dev_id] != hashes[d.dev_id]]
+        removed = [dev_id for dev_id in self._hashes if dev_id not in hashes]
+        if not (added or changed or removed):
+            _LOGGER.debug("Device list unchanged")
+            return
+
+        _LOGGER.info(
+            f"Device list changed: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
+        self._hashes = hashes
+        self.coordinator.async_set_devices(devices)
+
+        dev_reg = device_registry.async_get(self.hass)
+        for dev_id in removed:
+            ha_dev = dev_reg.async_get_device({(DOMAIN, dev_id)})
+            # Disabled devices are left out of the device list, but they
+            # still belong to the account
+            if ha_dev and not ha_dev.disabled:
+                _LOGGER.info(f"Removing device '{ha_dev.name}' which is no longer in the account")
+                dev_reg.async_update_device(ha_dev.id, remove_config_entry_id=entry_id)
+        for device in changed:
+            ha_dev = dev_reg.async_get_device({(DOMAIN, device.dev_id)})
+            if ha_dev:
+                dev_reg.async_update_device(
+                    ha_dev.id, name=device.ha_dev_info.get("name"), model=device.ha_dev_info.get("model"))
+            async_dispatcher_send(self.hass, SIGNAL_DEVICE_UPDATED.format(entry_id, device.dev_id), device)
+        for device in added:
+            async_dispatcher_send(self.hass, SIGNAL_DEVICE_ADDED.format(entry_id), device)
+
+        if added:
+            # Fetch the locations of the new devices right away
+            self.hass.async_create_task(self.coordinator.async_request_refresh())
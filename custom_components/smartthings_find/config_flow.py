@@ -17,9 +17,31 @@ from .const import (
     CONF_ACTIVE_MODE_SMARTTAGS,
     CONF_ACTIVE_MODE_SMARTTAGS_DEFAULT,
     CONF_ACTIVE_MODE_OTHERS,
-    CONF_ACTIVE_MODE_OTHERS_DEFAULT
+    CONF_ACTIVE_MODE_OTHERS_DEFAULT,
+    CONF_ADAPTIVE_POLLING,
+    CONF_ADAPTIVE_POLLING_DEFAULT,
+    CONF_INCREMENTAL_UPDATES,
+    CONF_INCREMENTAL_UPDATES_DEFAULT,
+    CONF_MAX_CONCURRENCY,
+    CONF_MAX_CONCURRENCY_DEFAULT,
+    CONF_MAX_CONCURRENCY_MAX,
+    CONF_REQUESTS_PER_SECOND,
+    CONF_REQUESTS_PER_SECOND_DEFAULT,
+    CONF_ACTIVE_MIN_AGE,
+    CONF_ACTIVE_MIN_AGE_DEFAULT,
+    CONF_VERBOSE_ATTRIBUTES,
+    CONF_VERBOSE_ATTRIBUTES_DEFAULT,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_HEARTBEAT_INTERVAL_DEFAULT,
+    CONF_STALE_WINDOW,
+    CONF_STALE_WINDOW_DEFAULT,
+    CONF_HISTORY_SIZE,
+    CONF_HISTORY_SIZE_DEFAULT,
+    CONF_ACTIVE_SETTLE_DELAY,
+    CONF_ACTIVE_SETTLE_DELAY_DEFAULT
 )
-from .utils import fetch_csrf, get_login_url, create_stf_session
+from .hub import async_get_hub
+from .utils import fetch_csrf, get_login_url, create_stf_session, STFRequestEngine
 import logging
 from datetime import datetime, timezone
 
@@ -35,18 +57,16 @@ class SmartThingsFindConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     async def _validate_jsessionid(self, jsessionid: str) -> bool:
         """Validate a JSESSIONID by attempting to fetch a CSRF token from STF."""
-        temp_id = f"__config_flow_{self.flow_id}__"
-        if DOMAIN not in self.hass.data:
-            self.hass.data[DOMAIN] = {}
-        self.hass.data[DOMAIN][temp_id] = {}
-        session = create_stf_session(jsessionid)
+        # Same connection setup as the integration, through the connection pool
+        # shared by all accounts; closing the session leaves the pool open
+        connector = async_get_hub(self.hass).connector
+        session = STFRequestEngine(create_stf_session(jsessionid, connector=connector), max_concurrency=1)
         try:
-            await fetch_csrf(self.hass, session, temp_id)
+            await fetch_csrf(session)
             return True
         except ConfigEntryAuthFailed:
             return False
         finally:
-            self.hass.data[DOMAIN].pop(temp_id, None)
             await session.close()
 
     async def async_step_user(self, user_input=None):
@@ -143,6 +163,66 @@ class SmartThingsFindOptionsFlowHandler(OptionsFlowWithConfigEntry):
                         CONF_ACTIVE_MODE_OTHERS, CONF_ACTIVE_MODE_OTHERS_DEFAULT
                     ),
                 ): bool,
+                vol.Optional(
+                    CONF_ACTIVE_SETTLE_DELAY,
+                    default=self.options.get(
+                        CONF_ACTIVE_SETTLE_DELAY, CONF_ACTIVE_SETTLE_DELAY_DEFAULT
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Clamp(min=0, max=60)),
+                vol.Optional(
+                    CONF_ACTIVE_MIN_AGE,
+                    default=self.options.get(
+                        CONF_ACTIVE_MIN_AGE, CONF_ACTIVE_MIN_AGE_DEFAULT
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Clamp(min=0, max=86400)),
+                vol.Optional(
+                    CONF_ADAPTIVE_POLLING,
+                    default=self.options.get(
+                        CONF_ADAPTIVE_POLLING, CONF_ADAPTIVE_POLLING_DEFAULT
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_INCREMENTAL_UPDATES,
+                    default=self.options.get(
+                        CONF_INCREMENTAL_UPDATES, CONF_INCREMENTAL_UPDATES_DEFAULT
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_MAX_CONCURRENCY,
+                    default=self.options.get(
+                        CONF_MAX_CONCURRENCY, CONF_MAX_CONCURRENCY_DEFAULT
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Clamp(min=1, max=CONF_MAX_CONCURRENCY_MAX)),
+                vol.Optional(
+                    CONF_REQUESTS_PER_SECOND,
+                    default=self.options.get(
+                        CONF_REQUESTS_PER_SECOND, CONF_REQUESTS_PER_SECOND_DEFAULT
+                    ),
+                ): vol.All(vol.Coerce(float), vol.Clamp(min=0.5, max=50)),
+                vol.Optional(
+                    CONF_VERBOSE_ATTRIBUTES,
+                    default=self.options.get(
+                        CONF_VERBOSE_ATTRIBUTES, CONF_VERBOSE_ATTRIBUTES_DEFAULT
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_HEARTBEAT_INTERVAL,
+                    default=self.options.get(
+                        CONF_HEARTBEAT_INTERVAL, CONF_HEARTBEAT_INTERVAL_DEFAULT
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Clamp(min=0, max=7200)),
+                vol.Optional(
+                    CONF_STALE_WINDOW,
+                    default=self.options.get(
+                        CONF_STALE_WINDOW, CONF_STALE_WINDOW_DEFAULT
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Clamp(min=0, max=86400)),
+                vol.Optional(
+                    CONF_HISTORY_SIZE,
+                    default=self.options.get(
+                        CONF_HISTORY_SIZE, CONF_HISTORY_SIZE_DEFAULT
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Clamp(min=0, max=10000)),
             }
         )
         return self.async_show_form(step_id="init", data_schema=data_schema)
\ No newline at end of file
@@ -1,5 +1,25 @@
+from datetime import timedelta
+
 DOMAIN = "smartthings_find"
 
+# Dispatcher signals of the device catalogue, formatted with the entry id
+# (and the device id for updates)
+SIGNAL_DEVICE_ADDED = f"{DOMAIN}_device_added_{{}}"
+SIGNAL_DEVICE_UPDATED = f"{DOMAIN}_device_updated_{{}}_{{}}"
+# Sent by the coordinator when a part of a device (e.g. an earbud case) reports
+# a location for the first time, formatted with the entry id
+SIGNAL_SUB_DEVICE_ADDED = f"{DOMAIN}_sub_device_added_{{}}"
+
+# How often the device list is checked for added, changed and removed devices
+CATALOGUE_REFRESH_INTERVAL = timedelta(hours=6)
+
+# Persisted device list and last results, one store per config entry
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 30
+# The location history has a store of its own, written less often
+HISTORY_STORAGE_VERSION = 1
+HISTORY_SAVE_DELAY = 300
+
 CONF_JSESSIONID = "jsessionid"
 CONF_SESSION_CREATED_AT = "session_created_at"
 
@@ -12,6 +32,131 @@ CONF_ACTIVE_MODE_OTHERS_DEFAULT = False
 CONF_UPDATE_INTERVAL = "update_interval"
 CONF_UPDATE_INTERVAL_DEFAULT = 120
 
+CONF_ACTIVE_SETTLE_DELAY = "active_settle_delay"
+CONF_ACTIVE_SETTLE_DELAY_DEFAULT = 15
+
+# Active mode only wakes up devices whose newest fix is older than this (seconds)
+CONF_ACTIVE_MIN_AGE = "active_min_age"
+CONF_ACTIVE_MIN_AGE_DEFAULT = 300
+
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_ADAPTIVE_POLLING_DEFAULT = True
+
+CONF_INCREMENTAL_UPDATES = "incremental_updates"
+CONF_INCREMENTAL_UPDATES_DEFAULT = True
+
+# Add the raw API data (operations, device list entry) to the state attributes
+CONF_VERBOSE_ATTRIBUTES = "verbose_attributes"
+CONF_VERBOSE_ATTRIBUTES_DEFAULT = False
+
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_MAX_CONCURRENCY_DEFAULT = 4
+CONF_MAX_CONCURRENCY_MAX = 32
+
+CONF_REQUESTS_PER_SECOND = "requests_per_second"
+CONF_REQUESTS_PER_SECOND_DEFAULT = 5
+
+# Seconds without any request after which chkLogin.do is pinged to keep the
+# server session alive; 0 disables the heartbeat
+CONF_HEARTBEAT_INTERVAL = "heartbeat_interval"
+CONF_HEARTBEAT_INTERVAL_DEFAULT = 600
+
+# Seconds the last good result of a device is shown (marked stale) after its
+# updates started failing, before its entities become unavailable
+CONF_STALE_WINDOW = "stale_window"
+CONF_STALE_WINDOW_DEFAULT = 3600
+
+# Number of fixes kept in the location history of each device; 0 disables it
+CONF_HISTORY_SIZE = "history_size"
+CONF_HISTORY_SIZE_DEFAULT = 1000
+
+# Request engine: retries of a request answered with 429 or 5xx, and the
+# exponential backoff (in seconds) used if the server sends no Retry-After
+ENGINE_MAX_RETRIES = 3
+ENGINE_BACKOFF_BASE = 1
+ENGINE_BACKOFF_MAX = 60
+# Seconds a single request may take, including reading the response, and
+# establishing a connection; timeouts and dropped connections are retried like
+# 5xx responses
+ENGINE_REQUEST_TIMEOUT = 20
+ENGINE_CONNECT_TIMEOUT = 10
+
+# All config entries (Samsung accounts) share one connection pool and one
+# rate budget for SmartThings Find's host, on top of each entry's own limits.
+# The pool is as large as the concurrency a single entry may be configured for
+HUB_MAX_CONNECTIONS = CONF_MAX_CONCURRENCY_MAX
+HUB_REQUESTS_PER_SECOND = 10
+# Key of the hub in hass.data[DOMAIN], next to the data of the config entries
+DATA_HUB = "hub"
+
+# Connection pool: idle connections are kept open for longer than the default
+# update interval, so polls don't need a new TLS handshake (if the server keeps
+# them open as well), and DNS lookups are cached
+CONNECTOR_KEEPALIVE_TIMEOUT = 150
+CONNECTOR_DNS_CACHE_TTL = 600
+
+SERVICE_REFRESH_DEVICE = "refresh_device"
+SERVICE_GET_HISTORY = "get_history"
+
+# Calls of the refresh_device service (or presses of the Locate button) for the
+# same device within this many seconds share one refresh
+REFRESH_DEVICE_COALESCE = 10
+
+# Seconds a coordinator cycle may take; devices that haven't answered by then
+# keep their previous result and are polled again in the next cycle
+CYCLE_DEADLINE = 300
+
+# Upper bounds (seconds) of the request latency histogram buckets, and the
+# number of recent cycles / updates per device the metrics are computed over
+METRICS_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+METRICS_WINDOW = 50
+
+# STF's CSRF token is tied to the server session; renew it before it goes stale
+CSRF_RENEW_AFTER = timedelta(minutes=30)
+
+# Adaptive polling: each device is put in a motion tier by the time since it
+# last moved. A device moved if the distance from where it was last seen moving
+# exceeds the combined accuracy radius of both fixes (and at least
+# MOTION_MIN_DISTANCE meters); fixes without accuracy count as accurate to
+# MOTION_DEFAULT_ACCURACY meters
+MOTION_MIN_DISTANCE = 50
+MOTION_DEFAULT_ACCURACY = 100
+MOTION_TIER_MOVING = "moving"
+MOTION_TIER_RECENT = "recently_moved"
+MOTION_TIER_STATIONARY = "stationary"
+# Seconds since the last movement up to which a device is in a tier; devices
+# that didn't move for longer are stationary
+MOTION_TIER_WINDOW = {
+    MOTION_TIER_MOVING: 600,
+    MOTION_TIER_RECENT: 3600,
+}
+# Poll interval and interval between active location requests of each tier
+# (seconds); both are at least the update interval
+MOTION_TIER_INTERVALS = {
+    MOTION_TIER_MOVING: (0, 0),
+    MOTION_TIER_RECENT: (300, 900),
+    MOTION_TIER_STATIONARY: (1800, 21600),
+}
+# Upper bound (in seconds) of a device's poll interval, by deviceTypeCode.
+# SmartTags have no GPS of their own; their location changes whenever another
+# Galaxy device passes by, so they are read more often than the tiers say
+SCHEDULER_MAX_INTERVAL = {
+    'TAG': 900,
+}
+SCHEDULER_MAX_INTERVAL_DEFAULT = 1800
+# Devices due within this many seconds of a cycle are polled in that cycle
+SCHEDULER_SLACK = 5
+
+# Circuit breaker: after this many failed updates in a row a device is paused,
+# first for BREAKER_BACKOFF_BASE seconds, doubling with every failed probe
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BACKOFF_BASE = 300
+BREAKER_BACKOFF_MAX = 21600
+
+# Sub-devices of earbuds (subType CANAL2), which get entities before their
+# first location arrives; other parts get theirs when they first report one
+SUB_DEVICE_SIDES = ('left', 'right')
+
 BATTERY_LEVELS = {
     'FULL': 100,
     'MEDIUM': 50,
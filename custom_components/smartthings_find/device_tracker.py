@@ -3,66 +3,135 @@ from homeassistant.components.device_tracker.config_entry import TrackerEntity a
 from homeassistant.components.device_tracker.const import SourceType
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
-from .utils import get_sub_location, get_battery_level
+from .const import DOMAIN, SIGNAL_DEVICE_ADDED, SIGNAL_SUB_DEVICE_ADDED
+from .entity import STFDeviceEntity
+from .models import DeviceDescriptor, DeviceResult, LocationFix
 
 _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback) -> None:
     """Set up SmartThings Find device tracker entities."""
-    devices = hass.data[DOMAIN][entry.entry_id]["devices"]
     coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
     entities = []
-    for device in devices:
-        if 'subType' in device['data'] and device['data']['subType'] == 'CANAL2':
-            entities += [SmartThingsDeviceTracker(hass, coordinator, device, "left")]
-            entities += [SmartThingsDeviceTracker(hass, coordinator, device, "right")]
-        entities += [SmartThingsDeviceTracker(hass, coordinator, device)]
+    for device in coordinator.devices:
+        entities += _create_entities(hass, coordinator, device)
     async_add_entities(entities)
 
-class SmartThingsDeviceTracker(CoordinatorEntity, DeviceTrackerEntity):
+    @callback
+    def async_add_device(device: DeviceDescriptor) -> None:
+        """Add the entities of a device that was added to the account."""
+        async_add_entities(_create_entities(hass, coordinator, device))
+
+    @callback
+    def async_add_sub_device(device: DeviceDescriptor, part: str) -> None:
+        """Add the entity of a part that reported a location for the first time."""
+        async_add_entities([SmartThingsDeviceTracker(hass, coordinator, device, part)])
+
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_DEVICE_ADDED.format(entry.entry_id), async_add_device)
+    )
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_SUB_DEVICE_ADDED.format(entry.entry_id), async_add_sub_device)
+    )
+
+def _create_entities(hass: HomeAssistant, coordinator, device: DeviceDescriptor) -> list:
+    """Create the device tracker entities of a device and of its known parts."""
+    entities = []
+    for part in sorted(coordinator.sub_devices.get(device.dev_id, ())):
+        entities += [SmartThingsDeviceTracker(hass, coordinator, device, part)]
+    entities += [SmartThingsDeviceTracker(hass, coordinator, device)]
+    return entities
+
+class SmartThingsDeviceTracker(STFDeviceEntity, CoordinatorEntity, DeviceTrackerEntity):
     """Representation of a SmartTag device tracker."""
 
-    def __init__(self, hass: HomeAssistant, coordinator, device, subDeviceName=None):
+    # Volatile or bulky attributes, which would make up most of the recorder's
+    # rows of this entity. Only the curated attributes are recorded.
+    _unrecorded_attributes = frozenset({
+        "fetched_at",
+        "dev_name",
+        "location_found",
+        "used_loc",
+        "used_op",
+        "ops",
+        "device",
+    })
+    _use_device_picture = True
+
+    def __init__(self, hass: HomeAssistant, coordinator, device: DeviceDescriptor, subDeviceName=None):
         """Initialize the device tracker."""
         super().__init__(coordinator)
         self.hass = hass
-        self.device = device['data']
-        self.device_id = device['data']['dvceID']
         self.subDeviceName = subDeviceName
 
-        # Cached sub-location computed once per coordinator update
-        self._sub_op = {}
-        self._sub_loc = {}
+        # Values of the last written state; a new state is only written if they changed
+        self._last_fingerprint = None
 
-        self._attr_unique_id = f"stf_device_tracker_{device['data']['dvceID']}{'_' + subDeviceName if subDeviceName else ''}"
-        self._attr_name = device['data']['modelName'] + (' ' + subDeviceName.capitalize() if subDeviceName else '')
-        self._attr_device_info = device['ha_dev_info']
+        self._attr_unique_id = f"stf_device_tracker_{device.dev_id}{'_' + subDeviceName if subDeviceName else ''}"
+        self._set_device(device)
         self._attr_latitude = None
         self._attr_longitude = None
 
-        if 'icons' in device['data'] and 'coloredIcon' in device['data']['icons']:
-            self._attr_entity_picture = device['data']['icons']['coloredIcon']
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to results of this device only, in addition to full coordinator updates."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_device_listener(self.device_id, self._handle_device_update)
+        )
+
+    def _entity_name(self, device: DeviceDescriptor) -> str:
+        """Return the device's name, followed by the part for a sub-device."""
+        return device.name + (' ' + self.subDeviceName.capitalize() if self.subDeviceName else '')
 
     @callback
     def _handle_coordinator_update(self) -> None:
-        """Cache sub-location once per coordinator cycle, then write state."""
-        if self.subDeviceName and self.coordinator.data:
-            data = self.coordinator.data.get(self.device_id) or {}
-            self._sub_op, self._sub_loc = get_sub_location(
-                data.get('ops', []), self.subDeviceName
-            )
+        """Handle a full coordinator update, unless this device's result was already streamed."""
+        if self.coordinator.is_streamed(self.device_id):
+            return
+        self._handle_device_update()
+
+    @callback
+    def _handle_device_update(self) -> None:
+        """Write state if any of the values that make it up changed."""
+        fingerprint = self._state_fingerprint()
+        if fingerprint == self._last_fingerprint:
+            return
+        self._last_fingerprint = fingerprint
         self.async_write_ha_state()
 
+    def _state_fingerprint(self) -> tuple:
+        """Return the values that make up the state of this entity."""
+        if not self.available:
+            return (False,)
+        return (True, self._fix, self.battery_level, self._result.stale)
+
     def async_write_ha_state(self):
         if not self.enabled:
             _LOGGER.debug(f"Ignoring state write request for disabled entity '{self.entity_id}'")
             return
         return super().async_write_ha_state()
 
+    @property
+    def _result(self) -> DeviceResult | None:
+        """Parsed state of the device from the last coordinator cycle."""
+        if not self.coordinator.data:
+            return None
+        return self.coordinator.data.get(self.device_id)
+
+    @property
+    def _fix(self) -> LocationFix | None:
+        """Location of this entity: the device's or the sub-device's."""
+        result = self._result
+        if not result:
+            return None
+        if self.subDeviceName:
+            return result.sub_locations.get(self.subDeviceName)
+        return result.location
+
     @property
     def available(self) -> bool:
         """Return true if the device is available."""
@@ -74,7 +143,7 @@ class SmartThingsDeviceTracker(CoordinatorEntity, DeviceTrackerEntity):
         if not tag_data:
             _LOGGER.info(f"tag_data none for '{self.name}'; rendering state unavailable")
             return False
-        if not tag_data.get('update_success', False):
+        if not tag_data.update_success:
             _LOGGER.info(f"Last update for '{self.name}' failed; rendering state unavailable")
             return False
         return True
@@ -86,49 +155,53 @@ class SmartThingsDeviceTracker(CoordinatorEntity, DeviceTrackerEntity):
     @property
     def latitude(self):
         """Return the latitude of the device."""
-        if self.subDeviceName:
-            return self._sub_loc.get('latitude')
-        data = self.coordinator.data.get(self.device_id, {})
-        if data.get('location_found'):
-            return data.get('used_loc', {}).get('latitude')
-        return None
+        fix = self._fix
+        return fix.latitude if fix else None
 
     @property
     def longitude(self):
         """Return the longitude of the device."""
-        if self.subDeviceName:
-            return self._sub_loc.get('longitude')
-        data = self.coordinator.data.get(self.device_id, {})
-        if data.get('location_found'):
-            return data.get('used_loc', {}).get('longitude')
-        return None
+        fix = self._fix
+        return fix.longitude if fix else None
 
     @property
     def location_accuracy(self):
         """Return the location accuracy of the device."""
-        if self.subDeviceName:
-            return self._sub_loc.get('gps_accuracy')
-        data = self.coordinator.data.get(self.device_id, {})
-        if data.get('location_found'):
-            return data.get('used_loc', {}).get('gps_accuracy')
-        return None
+        fix = self._fix
+        return fix.accuracy if fix else None
 
     @property
     def battery_level(self):
         """Return the battery level of the device."""
-        if self.subDeviceName:
+        result = self._result
+        if self.subDeviceName or not result:
             return None
-        data = self.coordinator.data.get(self.device_id, {})
-        return get_battery_level(self.name, data.get('ops', []))
+        return result.battery
 
     @property
     def extra_state_attributes(self):
-        tag_data = self.coordinator.data.get(self.device_id, {})
-        device_data = self.device
-        if self.subDeviceName:
-            attrs = tag_data | self._sub_op | self._sub_loc
-        else:
-            attrs = dict(tag_data)  # shallow copy — don't mutate coordinator data
-        used_loc = attrs.get('used_loc')
-        attrs['last_seen'] = used_loc.get('gps_date') if used_loc else None
-        return attrs | device_data
+        """
+        Return the curated attributes; with verbose attributes, everything
+        else the integration knows about the device, too.
+
+        Location and accuracy are already part of the tracker's standard
+        attributes.
+        """
+        result = self._result
+        fix = self._fix
+        attrs = {
+            "dev_id": self.device_id,
+            "last_seen": fix.gps_date if fix else None,
+        }
+        if result:
+            attrs |= {
+                "update_success": result.update_success,
+                "stale": result.stale,
+                "used_op_type": result.used_op_type,
+                "fetched_at": result.fetched_at,
+            }
+        if self.coordinator.keep_raw:
+            if result:
+                attrs |= result.as_dict()
+            attrs["device"] = self.device.as_dict()
+        return attrs
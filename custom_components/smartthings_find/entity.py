@@ -0,0 +1,52 @@
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import Entity
+
+from .const import SIGNAL_DEVICE_UPDATED
+from .models import DeviceDescriptor
+
+
+class STFDeviceEntity(Entity):
+    """
+    Mixin for the entities of a single device, listed before the platform's
+    entity class.
+
+    Name, device info and (optionally) picture of the entity are taken from
+    the device's device list entry, and follow it when the device catalogue
+    finds that it changed. Subclasses call `_set_device` in their __init__.
+    """
+
+    # Appended to the device name to form the entity name
+    _name_suffix: str | None = None
+    # Show the device's icon as the entity picture
+    _use_device_picture = False
+
+    def _set_device(self, device: DeviceDescriptor) -> None:
+        """Take name, device info and picture from a device list entry."""
+        self.device = device
+        self.device_id = device.dev_id
+        self._attr_name = self._entity_name(device)
+        self._attr_device_info = device.ha_dev_info
+        if self._use_device_picture:
+            self._attr_entity_picture = device.icon_url
+
+    def _entity_name(self, device: DeviceDescriptor) -> str:
+        """Return the name of the entity for a device list entry."""
+        return f"{device.name} {self._name_suffix}" if self._name_suffix else device.name
+
+    async def async_added_to_hass(self) -> None:
+        """Follow changes of this device's device list entry."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_DEVICE_UPDATED.format(self.platform.config_entry.entry_id, self.device_id),
+                self._handle_descriptor_update
+            )
+        )
+
+    @callback
+    def _handle_descriptor_update(self, device: DeviceDescriptor) -> None:
+        """Use the new device list entry of this device."""
+        self._set_device(device)
+        self.async_write_ha_state()
@@ -0,0 +1,135 @@
+import base64
+import math
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Iterable
+
+from .models import LocationFix
+
+# A fix in its stored form: timestamp (seconds since the epoch), latitude and
+# longitude as doubles and the accuracy as float (NaN if unknown), little
+# endian so stored histories don't depend on the machine
+_RECORD = struct.Struct("<dddf")
+
+
+class LocationHistory:
+    """
+    Fixed-size ring buffer of the fixes of a single device, oldest first.
+
+    The fields of the fixes are kept in parallel arrays of machine floats
+    rather than as objects, so a buffer takes 28 bytes per fix no matter how
+    full it is, and a time range is found by binary search. Only fixes newer
+    than the newest one in the buffer are added, which keeps it sorted; once
+    the buffer is full, each new fix replaces the oldest one.
+    """
+
+    __slots__ = ("capacity", "_times", "_lats", "_lons", "_accs", "_start", "_len")
+
+    def __init__(self, capacity: int):
+        """Initialize an empty history holding up to `capacity` fixes."""
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._lats = array("d", bytes(8 * capacity))
+        self._lons = array("d", bytes(8 * capacity))
+        self._accs = array("f", bytes(4 * capacity))
+        # Physical index of the oldest fix, and number of fixes
+        self._start = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _index(self, i: int) -> int:
+        """Return the physical index of the i-th oldest fix."""
+        return (self._start + i) % self.capacity
+
+    @property
+    def newest(self) -> datetime | None:
+        """Return the date of the newest fix, None if the history is empty."""
+        if not self._len:
+            return None
+        return datetime.fromtimestamp(self._times[self._index(self._len - 1)], timezone.utc)
+
+    def _append(self, ts: float, lat: float, lon: float, acc: float) -> bool:
+        if self._len and ts <= self._times[self._index(self._len - 1)]:
+            return False
+        if self._len < self.capacity:
+            pos = self._index(self._len)
+            self._len += 1
+        else:
+            pos = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._times[pos] = ts
+        self._lats[pos] = lat
+        self._lons[pos] = lon
+        self._accs[pos] = acc
+        return True
+
+    def append(self, fix: LocationFix) -> bool:
+        """Add a fix; returns False if it has no coordinates or isn't newer than the newest one."""
+        if fix.gps_date is None or fix.latitude is None or fix.longitude is None:
+            return False
+        return self._append(
+            fix.gps_date.timestamp(), fix.latitude, fix.longitude,
+            fix.accuracy if fix.accuracy is not None else math.nan
+        )
+
+    def extend(self, fixes: Iterable[LocationFix]) -> int:
+        """Add fixes (oldest first) and return how many were added."""
+        return sum(self.append(fix) for fix in fixes)
+
+    def query(self, start: datetime | None = None, end: datetime | None = None, limit: int | None = None) -> list[LocationFix]:
+        """
+        Return the fixes between two dates, oldest first.
+
+        Args:
+            start (datetime | None): Date of the oldest fix to return (inclusive), None for no bound.
+            end (datetime | None): Date of the newest fix to return (inclusive), None for no bound.
+            limit (int | None): Return at most this many fixes, the newest ones of the range.
+
+        Returns:
+            list[LocationFix]: The fixes in the range.
+        """
+        key = self._time_at
+        lo = bisect_left(range(self._len), start.timestamp(), key=key) if start else 0
+        hi = bisect_right(range(self._len), end.timestamp(), key=key) if end else self._len
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return [self._fix_at(i) for i in range(lo, hi)]
+
+    def _time_at(self, i: int) -> float:
+        return self._times[self._index(i)]
+
+    def _fix_at(self, i: int) -> LocationFix:
+        pos = self._index(i)
+        acc = self._accs[pos]
+        return LocationFix(
+            latitude=self._lats[pos],
+            longitude=self._lons[pos],
+            accuracy=round(acc, 1) if not math.isnan(acc) else None,
+            gps_date=datetime.fromtimestamp(self._times[pos], timezone.utc),
+        )
+
+    def to_storage(self) -> str:
+        """Return the fixes, oldest first, as packed records in a base64 string."""
+        buf = bytearray(_RECORD.size * self._len)
+        for i in range(self._len):
+            pos = self._index(i)
+            _RECORD.pack_into(
+                buf, i * _RECORD.size,
+                self._times[pos], self._lats[pos], self._lons[pos], self._accs[pos]
+            )
+        return base64.b64encode(buf).decode("ascii")
+
+    @classmethod
+    def from_storage(cls, data: str, capacity: int) -> "LocationHistory":
+        """Create a history from the output of to_storage, keeping the newest `capacity` fixes."""
+        history = cls(capacity)
+        buf = base64.b64decode(data)
+        count = len(buf) // _RECORD.size
+        skip = max(count - capacity, 0)
+        for record in _RECORD.iter_unpack(buf[skip * _RECORD.size:count * _RECORD.size]):
+            history._append(*record)
+        return history
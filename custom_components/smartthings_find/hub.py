@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+import aiohttp
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, DATA_HUB, HUB_MAX_CONNECTIONS, HUB_REQUESTS_PER_SECOND
+from .utils import STFRequestEngine, TokenBucket, create_stf_connector
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class HubEntry:
+    """A config entry (Samsung account) registered with the hub."""
+
+    engine: STFRequestEngine
+    # Update interval of the entry's coordinator (seconds)
+    interval: float
+    registered_at: float
+    cycles: int = 0
+    # Seconds the entry's cycles waited for their turn, in total
+    waited: float = 0.0
+    # Start of the entry's last (or upcoming) cycle (time.monotonic)
+    last_cycle_start: float | None = None
+
+
+class STFHub:
+    """
+    Coordinates the config entries of the integration, which all send their
+    requests to the same host.
+
+    - The sessions of all entries share one connection pool.
+    - Requests of all entries draw from one rate budget for the host, on top
+      of each entry's own limits.
+    - The cycles of the entries are spread over the update interval: a cycle
+      starts at least interval / <number of entries> after the last cycle of
+      any other entry, so accounts don't send their bursts at the same time.
+
+    There is one hub, in hass.data[DOMAIN]; entries register with it once they
+    are set up and unregister when they are unloaded.
+    """
+
+    def __init__(self):
+        self.bucket = TokenBucket(HUB_REQUESTS_PER_SECOND)
+        self._connector: aiohttp.TCPConnector | None = None
+        self._entries: dict[str, HubEntry] = {}
+
+    @property
+    def connector(self) -> aiohttp.TCPConnector:
+        """Return the shared connection pool, creating it if necessary."""
+        if self._connector is None or self._connector.closed:
+            self._connector = create_stf_connector(HUB_MAX_CONNECTIONS)
+        return self._connector
+
+    def register(self, entry_id: str, engine: STFRequestEngine, interval: float) -> None:
+        """Register the request engine and update interval of a config entry."""
+        self._entries[entry_id] = HubEntry(engine=engine, interval=interval, registered_at=time.monotonic())
+        _LOGGER.debug(f"{len(self._entries)} config entries registered")
+
+    async def async_unregister(self, entry_id: str) -> None:
+        """Unregister a config entry; closes the connection pool after the last one."""
+        self._entries.pop(entry_id, None)
+        if not self._entries and self._connector is not None:
+            await self._connector.close()
+            self._connector = None
+
+    async def async_wait_turn(self, entry_id: str, wait: bool = True) -> float:
+        """
+        Wait until a config entry may start its cycle.
+
+        The start is reserved right away, so entries whose cycles are due at
+        the same time queue up one after another.
+
+        Args:
+            entry_id (str): The entry about to start a cycle.
+            wait (bool): Wait for the turn; if False, the cycle starts right
+                away and only its start is recorded (first and requested
+                refreshes, which someone is waiting for).
+
+        Returns:
+            float: The seconds waited.
+        """
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return 0.0
+        entry.cycles += 1
+        if not wait or len(self._entries) < 2:
+            entry.last_cycle_start = time.monotonic()
+            return 0.0
+
+        now = time.monotonic()
+        gap = entry.interval / len(self._entries)
+        start = now
+        others = sorted(
+            other.last_cycle_start for other_id, other in self._entries.items()
+            if other_id != entry_id and other.last_cycle_start is not None
+        )
+        for other_start in others:
+            start = max(start, other_start + gap)
+        entry.last_cycle_start = start
+
+        wait = start - now
+        if wait > 0:
+            entry.waited += wait
+            _LOGGER.debug(f"Waiting {wait:.1f}s for the cycles of other accounts")
+            await asyncio.sleep(wait)
+        return max(wait, 0.0)
+
+    def as_dict(self, entry_id: str | None = None) -> dict:
+        """Return the load of each registered entry, for the diagnostics of `entry_id`."""
+        now = time.monotonic()
+        total = sum(entry.engine.requests for entry in self._entries.values())
+        return {
+            "max_connections": HUB_MAX_CONNECTIONS,
+            "requests_per_second": HUB_REQUESTS_PER_SECOND,
+            "accounts": [
+                {
+                    "this_entry": other_id == entry_id,
+                    "update_interval": entry.interval,
+                    "requests": entry.engine.requests,
+                    "request_share": round(100 * entry.engine.requests / total, 1) if total else None,
+                    "requests_per_minute": round(60 * entry.engine.requests / max(now - entry.registered_at, 1), 2),
+                    "in_flight": entry.engine.in_flight,
+                    "queued": entry.engine.queued,
+                    "throttled": entry.engine.throttled,
+                    "cycles": entry.cycles,
+                    "avg_cycle_wait": round(entry.waited / entry.cycles, 1) if entry.cycles else None,
+                }
+                for other_id, entry in self._entries.items()
+            ],
+        }
+
+
+@callback
+def async_get_hub(hass: HomeAssistant) -> STFHub:
+    """Return the hub of the integration, creating it if necessary."""
+    return hass.data.setdefault(DOMAIN, {}).setdefault(DATA_HUB, STFHub())
@@ -0,0 +1,125 @@
+from bisect import bisect_left
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+from .const import METRICS_LATENCY_BUCKETS, METRICS_WINDOW
+
+
+@dataclass(slots=True)
+class EndpointMetrics:
+    """Latency histogram, status codes and bytes received of a single endpoint."""
+
+    requests: int = 0
+    bytes_received: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    # Status code (or "error" for requests that got no response) -> count
+    statuses: Counter = field(default_factory=Counter)
+    # Counts per bucket of METRICS_LATENCY_BUCKETS, plus one for slower requests
+    buckets: list = field(default_factory=lambda: [0] * (len(METRICS_LATENCY_BUCKETS) + 1))
+
+    def record(self, status: int | str, latency: float, size: int) -> None:
+        self.requests += 1
+        self.bytes_received += size
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.statuses[status] += 1
+        self.buckets[bisect_left(METRICS_LATENCY_BUCKETS, latency)] += 1
+
+    def percentile(self, q: float) -> float | None:
+        """Return the upper bound of the bucket holding the q-th percentile (seconds)."""
+        if not self.requests:
+            return None
+        rank = q / 100 * self.requests
+        seen = 0
+        for bound, count in zip(METRICS_LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, round(self.max_latency, 3))
+        return self.max_latency
+
+    @property
+    def errors(self) -> int:
+        return sum(count for status, count in self.statuses.items() if status == "error" or status >= 400)
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "bytes_received": self.bytes_received,
+            "latency_avg": round(self.total_latency / self.requests, 3) if self.requests else None,
+            "latency_p50": self.percentile(50),
+            "latency_p99": self.percentile(99),
+            "latency_max": round(self.max_latency, 3),
+            "latency_histogram": dict(zip(
+                [f"<={bound}" for bound in METRICS_LATENCY_BUCKETS] + [f">{METRICS_LATENCY_BUCKETS[-1]}"],
+                self.buckets
+            )),
+        }
+
+
+class RequestMetrics:
+    """Metrics of all requests sent by a request engine, keyed by endpoint path."""
+
+    def __init__(self):
+        self.endpoints: dict[str, EndpointMetrics] = {}
+
+    def record(self, endpoint: str, status: int | str, latency: float, size: int = 0) -> None:
+        metrics = self.endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self.endpoints[endpoint] = EndpointMetrics()
+        metrics.record(status, latency, size)
+
+    def as_dict(self) -> dict:
+        return {endpoint: metrics.as_dict() for endpoint, metrics in self.endpoints.items()}
+
+
+class CycleMetrics:
+    """Duration of the coordinator cycles and success rate of each device."""
+
+    def __init__(self):
+        self.cycles = 0
+        self.last_duration: float | None = None
+        self.last_polled = 0
+        # Active location requests left out because the device's fix was fresh,
+        # and because the device's motion tier didn't call for one yet
+        self.skipped_wakeups = 0
+        self.tier_skipped_wakeups = 0
+        self._durations: deque[float] = deque(maxlen=METRICS_WINDOW)
+        # Outcomes of the last updates of each device
+        self._outcomes: dict[str, deque[bool]] = {}
+
+    def record_cycle(self, duration: float, polled: int) -> None:
+        self.cycles += 1
+        self.last_duration = duration
+        self.last_polled = polled
+        self._durations.append(duration)
+
+    def record_device(self, dev_id: str, success: bool) -> None:
+        outcomes = self._outcomes.get(dev_id)
+        if outcomes is None:
+            outcomes = self._outcomes[dev_id] = deque(maxlen=METRICS_WINDOW)
+        outcomes.append(success)
+
+    def forget(self, dev_id: str) -> None:
+        self._outcomes.pop(dev_id, None)
+
+    def success_rate(self, dev_id: str) -> float | None:
+        """Return the share of successful updates of a device (in percent), None if never polled."""
+        outcomes = self._outcomes.get(dev_id)
+        if not outcomes:
+            return None
+        return round(100 * sum(outcomes) / len(outcomes), 1)
+
+    def as_dict(self) -> dict:
+        durations = sorted(self._durations)
+        return {
+            "cycles": self.cycles,
+            "last_duration": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "last_polled": self.last_polled,
+            "skipped_wakeups": self.skipped_wakeups,
+            "tier_skipped_wakeups": self.tier_skipped_wakeups,
+            "duration_p50": round(durations[len(durations) // 2], 3) if durations else None,
+            "duration_max": round(durations[-1], 3) if durations else None,
+        }
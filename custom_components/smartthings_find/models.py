@@ -0,0 +1,179 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping
+
+from homeassistant.helpers.entity import DeviceInfo
+
+_EMPTY_MAPPING = MappingProxyType({})
+
+
+@dataclass(frozen=True, slots=True)
+class LocationFix:
+    """A single location reported by SmartThings Find."""
+
+    latitude: float | None
+    longitude: float | None
+    accuracy: float | None
+    gps_date: datetime | None
+
+    def as_dict(self) -> dict:
+        """Return the fix in the format of the `used_loc` attribute."""
+        return {
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "gps_accuracy": self.accuracy,
+            "gps_date": self.gps_date,
+        }
+
+    def to_storage(self) -> list:
+        """Return the fix in a compact, JSON serializable form."""
+        return [
+            self.latitude,
+            self.longitude,
+            self.accuracy,
+            self.gps_date.isoformat() if self.gps_date else None,
+        ]
+
+    @classmethod
+    def from_storage(cls, data: list) -> "LocationFix":
+        """Create a fix from the output of to_storage."""
+        lat, lon, acc, gps_date = data
+        return cls(lat, lon, acc, datetime.fromisoformat(gps_date) if gps_date else None)
+
+
+@dataclass(frozen=True, slots=True)
+class DeviceResult:
+    """
+    Parsed state of a device, built once per coordinator cycle.
+
+    Entities read from the result only, so their properties don't depend
+    on the number of operations in the API response. The raw operations
+    are only kept if the coordinator was asked to (`keep_raw`).
+    """
+
+    dev_id: str
+    dev_name: str
+    update_success: bool = False
+    # The last good result, served while the device can't be updated
+    stale: bool = False
+    # When the result was fetched (UTC), None if the update failed
+    fetched_at: datetime | None = None
+    location: LocationFix | None = None
+    battery: int | None = None
+    # Locations of sub-devices (e.g. left and right earbud, case), keyed by part
+    sub_locations: Mapping[str, LocationFix] = field(default_factory=lambda: _EMPTY_MAPPING)
+    # All distinct fixes in the response, oldest first, for the location
+    # history (only if it is enabled; not persisted with the result)
+    fixes: tuple[LocationFix, ...] = ()
+    # oprnType of the operation the location was taken from
+    used_op_type: str | None = None
+    used_op: dict | None = None
+    ops: list | None = None
+
+    @property
+    def location_found(self) -> bool:
+        return self.location is not None
+
+    def as_dict(self) -> dict:
+        """Return the result in the format of the former result dict, for the state attributes."""
+        attrs = {
+            "dev_name": self.dev_name,
+            "dev_id": self.dev_id,
+            "update_success": self.update_success,
+            "stale": self.stale,
+            "fetched_at": self.fetched_at,
+            "location_found": self.location_found,
+            "used_loc": self.location.as_dict() if self.location else None,
+            "used_op_type": self.used_op_type,
+        }
+        if self.ops is not None:
+            attrs["used_op"] = self.used_op
+            attrs["ops"] = self.ops
+        return attrs
+
+    def to_storage(self) -> dict:
+        """Return the parsed result in a compact, JSON serializable form (without raw data)."""
+        return {
+            "dev_id": self.dev_id,
+            "dev_name": self.dev_name,
+            "update_success": self.update_success,
+            "stale": self.stale,
+            "fetched_at": self.fetched_at.isoformat() if self.fetched_at else None,
+            "location": self.location.to_storage() if self.location else None,
+            "battery": self.battery,
+            "sub_locations": {part: fix.to_storage() for part, fix in self.sub_locations.items()},
+            "used_op_type": self.used_op_type,
+        }
+
+    @classmethod
+    def from_storage(cls, data: dict) -> "DeviceResult":
+        """Create a result from the output of to_storage."""
+        return cls(
+            dev_id=data["dev_id"],
+            dev_name=data["dev_name"],
+            update_success=data["update_success"],
+            stale=data.get("stale", False),
+            fetched_at=datetime.fromisoformat(data["fetched_at"]) if data.get("fetched_at") else None,
+            location=LocationFix.from_storage(data["location"]) if data.get("location") else None,
+            battery=data.get("battery"),
+            sub_locations=MappingProxyType({
+                part: LocationFix.from_storage(fix) for part, fix in (data.get("sub_locations") or {}).items()
+            }),
+            used_op_type=data.get("used_op_type"),
+        )
+
+
+@dataclass(slots=True)
+class DeviceDescriptor:
+    """A device of the SmartThings Find account, as returned by get_devices."""
+
+    dev_id: str
+    name: str
+    model_id: str | None
+    type_code: str | None
+    sub_type: str | None
+    usr_id: str | None
+    icon_url: str | None
+    ha_dev_info: DeviceInfo
+    # Full entry of the device list, only kept if asked for
+    raw: dict | None = field(default=None, repr=False)
+
+    @classmethod
+    def from_api(cls, data: dict, ha_dev_info: DeviceInfo, keep_raw: bool = False) -> "DeviceDescriptor":
+        """Create a descriptor from an entry of the getDeviceList.do response."""
+        return cls(
+            dev_id=data['dvceID'],
+            name=data['modelName'],
+            model_id=data.get('modelID'),
+            type_code=data.get('deviceTypeCode'),
+            sub_type=data.get('subType'),
+            usr_id=data.get('usrId'),
+            icon_url=(data.get('icons') or {}).get('coloredIcon'),
+            ha_dev_info=ha_dev_info,
+            raw=data if keep_raw else None,
+        )
+
+    def to_storage(self) -> dict:
+        """Return the fields needed to recreate the descriptor, using the API's key names."""
+        return {
+            "dvceID": self.dev_id,
+            "modelName": self.name,
+            "modelID": self.model_id,
+            "deviceTypeCode": self.type_code,
+            "subType": self.sub_type,
+            "usrId": self.usr_id,
+            "icons": {"coloredIcon": self.icon_url} if self.icon_url else {},
+        }
+
+    def as_dict(self) -> dict:
+        """Return the device fields for the state attributes, using the API's key names."""
+        if self.raw is not None:
+            return dict(self.raw)
+        return {
+            "dvceID": self.dev_id,
+            "modelName": self.name,
+            "modelID": self.model_id,
+            "deviceTypeCode": self.type_code,
+            "subType": self.sub_type,
+        }
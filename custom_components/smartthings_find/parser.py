@@ -0,0 +1,227 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Mapping
+
+from .const import BATTERY_LEVELS
+from .models import LocationFix
+
+_LOGGER = logging.getLogger(__name__)
+
+LOCATION_OP_TYPES = frozenset(('LOCATION', 'LASTLOC', 'OFFLINE_LOC'))
+
+_EMPTY_MAPPING = MappingProxyType({})
+
+
+@dataclass(slots=True)
+class ParsedOperations:
+    """Everything the integration uses from the operations of a setLastSelect.do response."""
+
+    location: LocationFix | None = None
+    # The operation the location was taken from
+    used_op: dict | None = None
+    battery: int | None = None
+    # Locations of sub-devices (e.g. left and right earbud, case), keyed by part
+    sub_locations: Mapping[str, LocationFix] = field(default_factory=lambda: _EMPTY_MAPPING)
+    # All distinct fixes of the device, oldest first (only if asked for)
+    fixes: tuple[LocationFix, ...] = ()
+
+
+def parse_operations(dev_name: str, ops: list, all_fixes: bool = False, fixes_after: datetime | None = None) -> ParsedOperations:
+    """
+    Extracts location, battery level and sub-device locations from the operations
+    of a device in a single pass.
+
+    Often the response contains multiple locations (especially for non-SmartTag
+    devices such as phones). We go through all of them and pick the newest one
+    with valid coordinates. Sometimes locations are encrypted (usually OFFLINE_LOC),
+    we ignore these. They could probably also be decrypted; there is a special getEncToken-Endpoint
+    which returns some sort of key. Since the only encrypted locations encountered
+    so far were even older than the non encrypted ones, this wasn't tried yet.
+
+    Dates are compared as the raw fixed-width strings, which sort the same way as
+    the dates they represent. Only the dates of the picked fixes are decoded,
+    and, if all fixes are asked for (for the location history), those of the
+    fixes newer than `fixes_after`.
+
+    Args:
+        dev_name (str): The name of the device, for logging.
+        ops (list): List of operations from the API.
+        all_fixes (bool): Also return all distinct fixes, not only the newest.
+        fixes_after (datetime | None): Leave fixes up to this date (UTC) out of them,
+            e.g. the newest fix of the device's history.
+
+    Returns:
+        ParsedOperations: The parsed data.
+    """
+    best_op = None
+    best_loc = None
+    best_date = None
+    # Older candidates, in case the coordinates of the newest one are invalid
+    older = []
+    battery_raw = None
+    sub_best = None
+    # Date -> location of every fix with coordinates, if asked for
+    fixes = {} if all_fixes else None
+    after = fixes_after.strftime("%Y%m%d%H%M%S") if fixes_after else None
+
+    for op in ops:
+        op_type = op.get('oprnType')
+
+        if op_type == 'CHECK_CONNECTION':
+            if battery_raw is None and 'battery' in op:
+                battery_raw = op['battery']
+            continue
+
+        if op_type not in LOCATION_OP_TYPES:
+            continue
+
+        if 'latitude' in op:
+            loc = op
+            extra = op.get('extra')
+            date = extra.get('gpsUtcDt') if extra else None
+            if not _is_stf_date(date):
+                _LOGGER.error(
+                    f"[{dev_name}] No UTC date found for operation '{op_type}', this should not happen!")
+                _LOGGER.debug(f"[{dev_name}] Operation without date: %r", op)
+                continue
+        elif 'encLocation' in op:
+            loc = op['encLocation']
+            if loc.get('encrypted'):
+                _LOGGER.debug(f"[{dev_name}] Ignoring encrypted location ({op_type})")
+                continue
+            # Locations of the parts of multi-part devices are nested in the
+            # encLocation, keyed by part; take every location-shaped entry
+            for part, sub in loc.items():
+                if type(sub) is not dict or ('latitude' not in sub and 'longitude' not in sub):
+                    continue
+                sub_date = sub.get('gpsUtcDt')
+                if _is_stf_date(sub_date) and (sub_best is None or part not in sub_best or sub_best[part][0] < sub_date):
+                    if sub_best is None:
+                        sub_best = {}
+                    sub_best[part] = (sub_date, sub)
+            date = loc.get('gpsUtcDt')
+            if not _is_stf_date(date):
+                if 'latitude' in loc or 'longitude' in loc:
+                    _LOGGER.debug(f"[{dev_name}] Ignoring location with missing date ({op_type})")
+                continue
+        else:
+            continue
+
+        if (fixes is not None and (after is None or date > after) and date not in fixes
+                and 'latitude' in loc and 'longitude' in loc):
+            fixes[date] = loc
+        if 'latitude' not in loc and 'longitude' not in loc:
+            _LOGGER.warning(f"[{dev_name}] Found no coordinates in operation '{op_type}'")
+            continue
+        if best_date is not None and best_date >= date:
+            _LOGGER.debug(f"[{dev_name}] Ignoring location older than the previous ({op_type})")
+            older.append((date, op, loc))
+            continue
+
+        if best_op is not None:
+            older.append((best_date, best_op, best_loc))
+        best_op, best_loc, best_date = op, loc, date
+
+    result = ParsedOperations()
+    if best_op is not None:
+        try:
+            result.location = _to_fix(best_loc, best_date)
+            result.used_op = best_op
+        except (TypeError, ValueError) as e:
+            _LOGGER.warning(f"[{dev_name}] Invalid coordinates in operation '{best_op.get('oprnType')}': {e}")
+            # Fall back to the newest older fix with valid coordinates
+            for date, op, loc in sorted(older, key=lambda c: c[0], reverse=True):
+                try:
+                    result.location = _to_fix(loc, date)
+                    result.used_op = op
+                    break
+                except (TypeError, ValueError):
+                    continue
+    if battery_raw is not None:
+        result.battery = _to_battery(dev_name, battery_raw)
+    if sub_best:
+        sub_locations = {}
+        for part, (sub_date, sub) in sub_best.items():
+            try:
+                sub_locations[part] = _to_fix(sub, sub_date)
+            except (TypeError, ValueError) as e:
+                _LOGGER.warning(f"[{dev_name}] Invalid location of sub-device '{part}': {e}")
+        result.sub_locations = MappingProxyType(sub_locations)
+    if fixes:
+        result.fixes = tuple(_to_fixes(dev_name, fixes))
+    return result
+
+
+def parse_stf_date(datestr: str) -> datetime:
+    """
+    Parses a date string in the format "%Y%m%d%H%M%S" to a datetime object.
+    This is the format, the SmartThings Find API uses.
+
+    The format is fixed-width, so slicing is a lot cheaper than strptime.
+
+    Args:
+        datestr (str): The date string in the format "%Y%m%d%H%M%S".
+
+    Returns:
+        datetime: A timezone-aware (UTC) datetime object representing the input date string.
+    """
+    return datetime(
+        int(datestr[0:4]), int(datestr[4:6]), int(datestr[6:8]),
+        int(datestr[8:10]), int(datestr[10:12]), int(datestr[12:14]),
+        tzinfo=timezone.utc
+    )
+
+
+def calc_gps_accuracy(hu: float, vu: float) -> float:
+    """
+    Calculate the GPS accuracy using the Pythagorean theorem.
+    Returns the combined GPS accuracy based on the horizontal
+    and vertical uncertainties provided by the API
+
+    Args:
+        hu (float): Horizontal uncertainty.
+        vu (float): Vertical uncertainty.
+
+    Returns:
+        float: Calculated GPS accuracy.
+    """
+    try:
+        return round((float(hu)**2 + float(vu)**2) ** 0.5, 1)
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_stf_date(value) -> bool:
+    return type(value) is str and len(value) == 14 and value.isdigit()
+
+
+def _to_fix(loc: dict, date: str) -> LocationFix:
+    lat = loc.get('latitude')
+    lon = loc.get('longitude')
+    return LocationFix(
+        latitude=float(lat) if lat is not None else None,
+        longitude=float(lon) if lon is not None else None,
+        accuracy=calc_gps_accuracy(loc.get('horizontalUncertainty'), loc.get('verticalUncertainty')),
+        gps_date=parse_stf_date(date),
+    )
+
+
+def _to_fixes(dev_name: str, fixes: dict):
+    """Yield the fixes of a date -> location dict, oldest first, skipping invalid ones."""
+    for date in sorted(fixes):
+        try:
+            yield _to_fix(fixes[date], date)
+        except (TypeError, ValueError):
+            _LOGGER.debug(f"[{dev_name}] Leaving invalid fix of {date} out of the history")
+
+
+def _to_battery(dev_name: str, batt_raw) -> int | None:
+    batt = BATTERY_LEVELS.get(batt_raw)
+    if batt is None:
+        try:
+            batt = int(batt_raw)
+        except (TypeError, ValueError):
+            _LOGGER.warning(f"[{dev_name}]: Received invalid battery level: {batt_raw}")
+    return batt
@@ -0,0 +1,248 @@
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from .const import (
+    MOTION_MIN_DISTANCE,
+    MOTION_DEFAULT_ACCURACY,
+    MOTION_TIER_MOVING,
+    MOTION_TIER_RECENT,
+    MOTION_TIER_STATIONARY,
+    MOTION_TIER_WINDOW,
+    MOTION_TIER_INTERVALS,
+    SCHEDULER_MAX_INTERVAL,
+    SCHEDULER_MAX_INTERVAL_DEFAULT,
+    SCHEDULER_SLACK,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_BACKOFF_BASE,
+    BREAKER_BACKOFF_MAX
+)
+from .models import DeviceDescriptor, DeviceResult, LocationFix
+from .utils import calc_distance
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class DeviceSchedule:
+    """Polling state of a single device."""
+
+    next_due: datetime | None = None
+    interval: float = 0
+    # Seconds between active location requests, and when the last one was sent
+    active_interval: float = 0
+    last_active_request: datetime | None = None
+    tier: str | None = None
+    last_fix_date: datetime | None = None
+    # Fix the device was last seen moving at; movement is measured from here
+    anchor: LocationFix | None = None
+    last_moved_at: datetime | None = None
+
+
+def has_moved(anchor: LocationFix, fix: LocationFix) -> tuple[bool, float]:
+    """
+    Return whether a device moved between two fixes, and the distance between them.
+
+    Both fixes may be off by their accuracy radius, so the distance has to
+    exceed the combined radius before it counts as movement.
+
+    Args:
+        anchor (LocationFix): The fix the device was last seen moving at.
+        fix (LocationFix): The new fix.
+
+    Returns:
+        tuple[bool, float]: Whether the device moved, and the distance (meters).
+    """
+    distance = calc_distance(anchor.latitude, anchor.longitude, fix.latitude, fix.longitude)
+    radius = math.hypot(
+        anchor.accuracy if anchor.accuracy is not None else MOTION_DEFAULT_ACCURACY,
+        fix.accuracy if fix.accuracy is not None else MOTION_DEFAULT_ACCURACY,
+    )
+    return distance > max(radius, MOTION_MIN_DISTANCE), distance
+
+
+def classify_motion(idle: float) -> str:
+    """Return the motion tier of a device that didn't move for `idle` seconds."""
+    if idle <= MOTION_TIER_WINDOW[MOTION_TIER_MOVING]:
+        return MOTION_TIER_MOVING
+    if idle <= MOTION_TIER_WINDOW[MOTION_TIER_RECENT]:
+        return MOTION_TIER_RECENT
+    return MOTION_TIER_STATIONARY
+
+
+class DevicePollScheduler:
+    """
+    Decides which devices have to be polled, and woken up, in a coordinator cycle.
+
+    Every device is put in a motion tier ("moving", "recently moved" or
+    "stationary") by the time since it last moved, and gets its own next-due
+    time and active request interval from its tier. A moving device is polled
+    (and woken up in active mode) every update interval, a stationary one only
+    rarely, but at least as often as SCHEDULER_MAX_INTERVAL for its type.
+    Devices without a usable fix are always polled in the next cycle.
+    """
+
+    def __init__(self, base_interval: int):
+        """Initialize the scheduler with the coordinator's update interval (seconds)."""
+        self.base_interval = base_interval
+        self._schedules: dict[str, DeviceSchedule] = {}
+
+    def is_due(self, dev_id: str, now: datetime) -> bool:
+        """Return True if the device has to be polled in the cycle starting at `now`."""
+        schedule = self._schedules.get(dev_id)
+        if not schedule or not schedule.next_due:
+            return True
+        return schedule.next_due - timedelta(seconds=SCHEDULER_SLACK) <= now
+
+    def due_devices(self, devices: list[DeviceDescriptor], now: datetime) -> list[DeviceDescriptor]:
+        """Return the subset of `devices` (as returned by get_devices) that is due."""
+        return [d for d in devices if self.is_due(d.dev_id, now)]
+
+    def is_active_due(self, dev_id: str, now: datetime) -> bool:
+        """Return True if the device may be asked for a location update (active mode) in the cycle starting at `now`."""
+        schedule = self._schedules.get(dev_id)
+        if not schedule or not schedule.last_active_request:
+            return True
+        elapsed = (now - schedule.last_active_request).total_seconds()
+        return elapsed + SCHEDULER_SLACK >= schedule.active_interval
+
+    def record_active_request(self, dev_id: str, now: datetime) -> None:
+        """Remember that the device was asked for a location update."""
+        self._schedules.setdefault(dev_id, DeviceSchedule()).last_active_request = now
+
+    def forget(self, dev_id: str) -> None:
+        """Drop the schedule of a device that was removed."""
+        self._schedules.pop(dev_id, None)
+
+    def get_schedule(self, dev_id: str) -> DeviceSchedule | None:
+        """Return the current schedule of a device, if it was polled before."""
+        return self._schedules.get(dev_id)
+
+    def record(self, device: DeviceDescriptor, result: DeviceResult, now: datetime) -> None:
+        """
+        Update a device's motion tier and schedule from the result of get_device_location.
+
+        Args:
+            device (DeviceDescriptor): The device as obtained from get_devices.
+            result (DeviceResult): The result of get_device_location for this device.
+            now (datetime): Start of the current cycle (UTC).
+        """
+        schedule = self._schedules.setdefault(device.dev_id, DeviceSchedule())
+        fix = result.location if result.update_success else None
+
+        if not fix or fix.latitude is None or fix.longitude is None or fix.gps_date is None:
+            # Nothing to judge the movement by; try again next cycle
+            schedule.interval = self.base_interval
+            schedule.next_due = now + timedelta(seconds=schedule.interval)
+            return
+
+        if schedule.anchor is None:
+            schedule.anchor = fix
+            schedule.last_moved_at = fix.gps_date
+        elif fix.gps_date > schedule.last_fix_date:
+            moved, distance = has_moved(schedule.anchor, fix)
+            if moved:
+                _LOGGER.debug(f"[{device.name}] Moved {distance:.0f} m")
+                schedule.anchor = fix
+                schedule.last_moved_at = fix.gps_date
+        if schedule.last_fix_date is None or fix.gps_date > schedule.last_fix_date:
+            schedule.last_fix_date = fix.gps_date
+
+        idle = max((now - schedule.last_moved_at).total_seconds(), 0)
+        tier = classify_motion(idle)
+        if tier != schedule.tier:
+            _LOGGER.debug(f"[{device.name}] Motion tier: {schedule.tier} -> {tier}")
+            schedule.tier = tier
+        poll_interval, active_interval = MOTION_TIER_INTERVALS[tier]
+        poll_interval = min(poll_interval, SCHEDULER_MAX_INTERVAL.get(device.type_code, SCHEDULER_MAX_INTERVAL_DEFAULT))
+        schedule.interval = max(poll_interval, self.base_interval)
+        schedule.active_interval = max(active_interval, self.base_interval)
+        schedule.next_due = now + timedelta(seconds=schedule.interval)
+        _LOGGER.debug(
+            f"[{device.name}] Idle for {idle:.0f}s ({tier}); next poll in {schedule.interval:.0f}s")
+
+
+@dataclass
+class BreakerState:
+    """Circuit breaker state of a single device."""
+
+    failures: int = 0
+    # Set while the breaker is open: no requests for the device until then
+    open_until: datetime | None = None
+    backoff: float = 0
+    # The breaker let a single probe through after open_until passed
+    probing: bool = False
+
+
+class DeviceCircuitBreaker:
+    """
+    Stops polling devices that fail every cycle (switched off, out of coverage).
+
+    After BREAKER_FAILURE_THRESHOLD failed updates in a row the breaker of a
+    device opens and the device isn't polled for a backoff time. After that,
+    a single probe is let through (half-open): if it succeeds the breaker
+    closes again, otherwise it opens again with twice the backoff.
+    """
+
+    def __init__(self):
+        self._states: dict[str, BreakerState] = {}
+
+    def allow(self, dev_id: str, now: datetime) -> bool:
+        """Return True if the device may be polled in the cycle starting at `now`."""
+        state = self._states.get(dev_id)
+        if not state or state.open_until is None:
+            return True
+        if now < state.open_until:
+            return False
+        state.probing = True
+        return True
+
+    def forget(self, dev_id: str) -> None:
+        """Drop the state of a device that was removed."""
+        self._states.pop(dev_id, None)
+
+    def record(self, device: DeviceDescriptor, success: bool, now: datetime, manual: bool = False) -> None:
+        """
+        Update a device's breaker from the outcome of its update.
+
+        Args:
+            device (DeviceDescriptor): The device as obtained from get_devices.
+            success (bool): Whether the update succeeded.
+            now (datetime): Start of the current cycle (UTC).
+            manual (bool): The update was asked for by the user. A failed one
+                leaves an open breaker and its backoff as they are.
+        """
+        state = self._states.setdefault(device.dev_id, BreakerState())
+        if success:
+            if state.open_until is not None:
+                _LOGGER.info(f"[{device.name}] Answered again; resuming updates")
+            self._states.pop(device.dev_id)
+            return
+        if manual and state.open_until is not None:
+            return
+
+        state.failures += 1
+        if state.probing:
+            state.backoff = min(state.backoff * 2, BREAKER_BACKOFF_MAX)
+            _LOGGER.debug(f"[{device.name}] Probe failed; pausing updates for {state.backoff:.0f}s")
+        elif state.failures >= BREAKER_FAILURE_THRESHOLD:
+            state.backoff = BREAKER_BACKOFF_BASE
+            _LOGGER.warning(
+                f"[{device.name}] Update failed {state.failures} times in a row; "
+                f"pausing updates for {state.backoff:.0f}s")
+        else:
+            return
+        state.probing = False
+        state.open_until = now + timedelta(seconds=state.backoff)
+
+    def as_dict(self, dev_id: str) -> dict | None:
+        """Return the breaker state of a device for the diagnostics."""
+        state = self._states.get(dev_id)
+        if not state:
+            return None
+        return {
+            "failures": state.failures,
+            "open_until": state.open_until.isoformat() if state.open_until else None,
+            "backoff": state.backoff,
+        }
@@ -1,42 +1,111 @@
 import logging
+from yarl import URL
 from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory, PERCENTAGE, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
-from .utils import get_battery_level
+from .const import DOMAIN, SIGNAL_DEVICE_ADDED, MOTION_TIER_MOVING, MOTION_TIER_RECENT, MOTION_TIER_STATIONARY
+from .entity import STFDeviceEntity
+from .models import DeviceDescriptor
+from .utils import URL_GET_CSRF, URL_DEVICE_LIST, URL_REQUEST_LOC_UPDATE, URL_SET_LAST_DEVICE
 
 _LOGGER = logging.getLogger(__name__)
 
+# Endpoints with a latency sensor, by the name used in the entity name
+ENDPOINTS = {
+    "chkLogin": URL_GET_CSRF,
+    "getDeviceList": URL_DEVICE_LIST,
+    "addOperation": URL_REQUEST_LOC_UPDATE,
+    "setLastSelect": URL_SET_LAST_DEVICE,
+}
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback) -> None:
     """Set up SmartThings Find sensor entities."""
-    devices = hass.data[DOMAIN][entry.entry_id]["devices"]
     coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
-    entities = []
-    for device in devices:
-        entities += [DeviceBatterySensor(hass, coordinator, device)]
+    session = hass.data[DOMAIN][entry.entry_id]["session"]
+    entities = [CycleDurationSensor(coordinator, entry)]
+    for name, url in ENDPOINTS.items():
+        entities += [EndpointLatencySensor(coordinator, entry, session, name, url)]
+    for device in coordinator.devices:
+        entities += _device_sensors(hass, coordinator, device)
     async_add_entities(entities)
 
+    @callback
+    def async_add_device(device: DeviceDescriptor) -> None:
+        """Add the entities of a device that was added to the account."""
+        async_add_entities(_device_sensors(hass, coordinator, device))
+
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_DEVICE_ADDED.format(entry.entry_id), async_add_device)
+    )
+
+
+def _device_sensors(hass: HomeAssistant, coordinator, device: DeviceDescriptor) -> list[SensorEntity]:
+    """Return the sensors of a single device."""
+    sensors = [DeviceBatterySensor(hass, coordinator, device), DeviceSuccessRateSensor(coordinator, device)]
+    # Devices only have a motion tier with adaptive polling
+    if coordinator.scheduler:
+        sensors += [DeviceMotionTierSensor(coordinator, device)]
+    return sensors
+
 
-class DeviceBatterySensor(CoordinatorEntity, SensorEntity):
+def _service_device_info(entry: ConfigEntry) -> DeviceInfo:
+    """Return the info of the service device of a config entry, which holds its integration-wide sensors."""
+    return DeviceInfo(
+        identifiers={(DOMAIN, entry.entry_id)},
+        entry_type=DeviceEntryType.SERVICE,
+        manufacturer="Samsung",
+        name=entry.title,
+    )
+
+
+class DeviceBatterySensor(STFDeviceEntity, CoordinatorEntity, SensorEntity):
     """Representation of a Device battery sensor."""
 
     _attr_device_class = SensorDeviceClass.BATTERY
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = '%'
+    _unrecorded_attributes = frozenset({"fetched_at"})
+    _name_suffix = "Battery"
 
-    def __init__(self, hass: HomeAssistant, coordinator, device):
+    def __init__(self, hass: HomeAssistant, coordinator, device: DeviceDescriptor):
         """Initialize the sensor."""
         super().__init__(coordinator)
-        self._attr_unique_id = f"stf_device_battery_{device['data']['dvceID']}"
-        self._attr_name = f"{device['data']['modelName']} Battery"
+        self._attr_unique_id = f"stf_device_battery_{device.dev_id}"
         self.hass = hass
-        self.device = device['data']
-        self.device_id = device['data']['dvceID']
-        self._attr_device_info = device['ha_dev_info']
+        self._set_device(device)
+        # Last written state; a new state is only written if it changed
+        self._last_fingerprint = None
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to results of this device only, in addition to full coordinator updates."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_device_listener(self.device_id, self._handle_device_update)
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle a full coordinator update, unless this device's result was already streamed."""
+        if self.coordinator.is_streamed(self.device_id):
+            return
+        self._handle_device_update()
+
+    @callback
+    def _handle_device_update(self) -> None:
+        """Write the state of this sensor if it changed."""
+        result = self.coordinator.data.get(self.device_id) if self.coordinator.data else None
+        fingerprint = (self.available, self.native_value, result.stale if result else None)
+        if fingerprint == self._last_fingerprint:
+            return
+        self._last_fingerprint = fingerprint
+        self.async_write_ha_state()
 
     @property
     def available(self) -> bool:
@@ -49,7 +118,7 @@ class DeviceBatterySensor(CoordinatorEntity, SensorEntity):
         if not tag_data:
             _LOGGER.info(f"battery sensor: tag_data none for '{self.name}'; rendering state unavailable")
             return False
-        if not tag_data.get('update_success', False):
+        if not tag_data.update_success:
             _LOGGER.info(f"Last update for battery sensor '{self.name}' failed; rendering state unavailable")
             return False
         return True
@@ -58,5 +127,131 @@ class DeviceBatterySensor(CoordinatorEntity, SensorEntity):
     def native_value(self):
         if not self.coordinator.data:
             return None
-        ops = self.coordinator.data.get(self.device_id, {}).get('ops', [])
-        return get_battery_level(self.name, ops)
+        result = self.coordinator.data.get(self.device_id)
+        return result.battery if result else None
+
+    @property
+    def extra_state_attributes(self):
+        result = self.coordinator.data.get(self.device_id) if self.coordinator.data else None
+        if not result:
+            return None
+        return {"stale": result.stale, "fetched_at": result.fetched_at}
+
+
+class CycleDurationSensor(CoordinatorEntity, SensorEntity):
+    """Duration of the last coordinator cycle, with cycle statistics as attributes."""
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_suggested_display_precision = 1
+
+    def __init__(self, coordinator, entry: ConfigEntry):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._attr_unique_id = f"stf_cycle_duration_{entry.entry_id}"
+        self._attr_name = "SmartThings Find Cycle duration"
+        self._attr_device_info = _service_device_info(entry)
+
+    @property
+    def available(self) -> bool:
+        return self.coordinator.metrics.last_duration is not None
+
+    @property
+    def native_value(self):
+        return self.coordinator.metrics.last_duration
+
+    @property
+    def extra_state_attributes(self):
+        return self.coordinator.metrics.as_dict()
+
+
+class EndpointLatencySensor(CoordinatorEntity, SensorEntity):
+    """Average latency of an STF endpoint, with its histogram and status codes as attributes."""
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _unrecorded_attributes = frozenset({"statuses", "latency_histogram"})
+    _attr_suggested_display_precision = 0
+
+    def __init__(self, coordinator, entry: ConfigEntry, session, name: str, url: str):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._attr_unique_id = f"stf_latency_{name}_{entry.entry_id}"
+        self._attr_name = f"SmartThings Find {name} latency"
+        self._attr_device_info = _service_device_info(entry)
+        self.session = session
+        self.endpoint = URL(url).path
+
+    @property
+    def _metrics(self):
+        return self.session.engine.metrics.endpoints.get(self.endpoint)
+
+    @property
+    def available(self) -> bool:
+        return self._metrics is not None
+
+    @property
+    def native_value(self):
+        metrics = self._metrics
+        if not metrics or not metrics.requests:
+            return None
+        return metrics.total_latency / metrics.requests * 1000
+
+    @property
+    def extra_state_attributes(self):
+        metrics = self._metrics
+        return metrics.as_dict() if metrics else None
+
+
+class DeviceSuccessRateSensor(STFDeviceEntity, CoordinatorEntity, SensorEntity):
+    """Share of successful location updates of a device over the recent cycles."""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = PERCENTAGE
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _name_suffix = "Update success rate"
+
+    def __init__(self, coordinator, device: DeviceDescriptor):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._attr_unique_id = f"stf_device_success_rate_{device.dev_id}"
+        self._set_device(device)
+
+    @property
+    def native_value(self):
+        return self.coordinator.metrics.success_rate(self.device_id)
+
+
+class DeviceMotionTierSensor(STFDeviceEntity, CoordinatorEntity, SensorEntity):
+    """Motion tier of a device, which decides how often it is polled and woken up."""
+
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_options = [MOTION_TIER_MOVING, MOTION_TIER_RECENT, MOTION_TIER_STATIONARY]
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _name_suffix = "Motion"
+
+    def __init__(self, coordinator, device: DeviceDescriptor):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._attr_unique_id = f"stf_device_motion_tier_{device.dev_id}"
+        self._set_device(device)
+
+    @property
+    def native_value(self):
+        return self.coordinator.get_motion_tier(self.device_id)
+
+    @property
+    def extra_state_attributes(self):
+        schedule = self.coordinator.scheduler.get_schedule(self.device_id)
+        if not schedule or not schedule.tier:
+            return None
+        return {
+            "last_moved": schedule.last_moved_at,
+            "poll_interval": schedule.interval,
+            "active_interval": schedule.active_interval,
+        }
@@ -1,22 +1,45 @@
+import asyncio
 import logging
-import json
-import pytz
 import aiohttp
 import random
 import string
 import re
 import html
-from datetime import datetime
+import math
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from yarl import URL
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.exceptions import ConfigEntryAuthFailed
 from homeassistant.helpers import device_registry
 
-from .const import DOMAIN, BATTERY_LEVELS, CONF_ACTIVE_MODE_SMARTTAGS, CONF_ACTIVE_MODE_OTHERS
+from .const import (
+    DOMAIN,
+    CONF_ACTIVE_MODE_SMARTTAGS,
+    CONF_ACTIVE_MODE_OTHERS,
+    CONF_MAX_CONCURRENCY_DEFAULT,
+    CONF_REQUESTS_PER_SECOND_DEFAULT,
+    ENGINE_MAX_RETRIES,
+    ENGINE_BACKOFF_BASE,
+    ENGINE_BACKOFF_MAX,
+    ENGINE_REQUEST_TIMEOUT,
+    ENGINE_CONNECT_TIMEOUT,
+    CONNECTOR_KEEPALIVE_TIMEOUT,
+    CONNECTOR_DNS_CACHE_TTL,
+    CSRF_RENEW_AFTER
+)
+from .metrics import RequestMetrics
+from .models import DeviceDescriptor, DeviceResult
+from .parser import parse_operations
 
 _LOGGER = logging.getLogger(__name__)
 
+# Errors of a request that are worth retrying: dropped connections and timeouts
+TRANSIENT_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
 # Browser User-Agent so Samsung's server doesn't reject requests as bots
 STF_USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -31,8 +54,33 @@ URL_DEVICE_LIST = f"{STF_DOMAIN}/device/getDeviceList.do"
 URL_REQUEST_LOC_UPDATE = f"{STF_DOMAIN}/dm/addOperation.do"
 URL_SET_LAST_DEVICE = f"{STF_DOMAIN}/device/setLastSelect.do"
 
+EARTH_RADIUS_M = 6371008.8
 
-def create_stf_session(jsessionid: str) -> aiohttp.ClientSession:
+
+def create_stf_connector(max_connections: int) -> aiohttp.TCPConnector:
+    """
+    Create a connection pool for SmartThings Find.
+
+    Idle connections are kept alive between polls and DNS lookups are cached,
+    so most requests skip the TCP and TLS handshakes.
+
+    Args:
+        max_connections: Maximum number of open connections to STF.
+
+    Returns:
+        aiohttp.TCPConnector: A new connection pool.
+    """
+    return aiohttp.TCPConnector(
+        limit=max(1, max_connections),
+        limit_per_host=max(1, max_connections),
+        keepalive_timeout=CONNECTOR_KEEPALIVE_TIMEOUT,
+        use_dns_cache=True,
+        ttl_dns_cache=CONNECTOR_DNS_CACHE_TTL,
+    )
+
+
+def create_stf_session(jsessionid: str, max_connections: int = CONF_MAX_CONCURRENCY_DEFAULT,
+                       connector: aiohttp.BaseConnector | None = None) -> aiohttp.ClientSession:
     """
     Create a dedicated aiohttp session for SmartThings Find.
 
@@ -40,8 +88,16 @@ def create_stf_session(jsessionid: str) -> aiohttp.ClientSession:
     JSESSIONID cookie properly scoped to smartthingsfind.samsung.com, and sets
     a browser User-Agent so Samsung's server treats requests like a real browser.
 
+    The session uses the given connection pool (which it doesn't close), or a
+    pool of its own sized to the number of requests the request engine sends
+    at once. Responses are decompressed by aiohttp (gzip and deflate, and
+    brotli if the Brotli package is installed), which also advertises the
+    supported encodings in the Accept-Encoding header.
+
     Args:
         jsessionid: The JSESSIONID cookie value from a logged-in STF browser session.
+        max_connections: Maximum number of open connections to STF, if the session has its own pool.
+        connector: A connection pool shared with other sessions (see create_stf_connector).
 
     Returns:
         aiohttp.ClientSession: A new session ready to use with the STF API.
@@ -52,10 +108,414 @@ def create_stf_session(jsessionid: str) -> aiohttp.ClientSession:
         response_url=URL(STF_DOMAIN)
     )
     return aiohttp.ClientSession(
+        connector=connector or create_stf_connector(max_connections),
+        connector_owner=connector is None,
         cookie_jar=cookie_jar,
-        headers={"User-Agent": STF_USER_AGENT}
+        headers={"User-Agent": STF_USER_AGENT},
+        timeout=aiohttp.ClientTimeout(total=ENGINE_REQUEST_TIMEOUT, connect=ENGINE_CONNECT_TIMEOUT),
+        auto_decompress=True,
     )
 
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average, with bursts of up to one
+    second worth of requests, and can be blocked for a while (e.g. after a
+    429 response).
+    """
+
+    def __init__(self, rate: float):
+        """Initialize a full bucket for `rate` requests per second."""
+        self.rate = max(0.1, float(rate))
+        self._capacity = max(1.0, self.rate)
+        self._tokens = self._capacity
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._blocked_until = 0.0
+
+    def block(self, delay: float) -> None:
+        """Hand out no tokens for the next `delay` seconds."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+
+    async def acquire(self) -> None:
+        """Take one token from the bucket, waiting for it to refill if necessary."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class STFRequestEngine:
+    """
+    Sends all requests to SmartThings Find through one rate-limited queue.
+
+    Wraps the dedicated aiohttp session of a config entry and offers the same
+    `get`/`post` interface, so it can be used wherever a session was used before.
+    Requests are subject to:
+      - a concurrency cap (at most `max_concurrency` requests in flight)
+      - a token bucket allowing `requests_per_second` on average, and the
+        rate budget shared by all config entries, if given
+      - the timeouts of the session (see create_stf_session)
+      - a retry with jittered backoff on 429 and 5xx responses, which honours
+        the Retry-After header and pauses all requests of this engine meanwhile
+      - a retry with jittered backoff of requests that timed out or whose
+        connection dropped
+    Requests that must not be sent twice (such as the operations posted to
+    addOperation.do) pass `retry=False` and are sent only once.
+    The latency, status code and size of every response are recorded per
+    endpoint in `metrics`.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession,
+                 max_concurrency: int = CONF_MAX_CONCURRENCY_DEFAULT,
+                 requests_per_second: float = CONF_REQUESTS_PER_SECOND_DEFAULT,
+                 shared_bucket: TokenBucket | None = None):
+        """
+        Initialize the engine.
+
+        Args:
+            session (aiohttp.ClientSession): The session created by create_stf_session.
+            max_concurrency (int): Maximum number of requests in flight.
+            requests_per_second (float): Average request rate allowed by the token bucket.
+            shared_bucket (TokenBucket | None): Rate budget shared with the engines of other config entries.
+        """
+        self.session = session
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._bucket = TokenBucket(requests_per_second)
+        self._shared_bucket = shared_bucket
+
+        # Counters, exposed in the diagnostics
+        self.queued = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.metrics = RequestMetrics()
+
+    @property
+    def closed(self) -> bool:
+        return self.session.closed
+
+    async def close(self) -> None:
+        await self.session.close()
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """Return the current counters of the engine."""
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retries": self.retries,
+        }
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, retry: bool = True, **kwargs):
+        """
+        Send a request once a slot and a token are available and yield the response.
+
+        429 and 5xx responses, timeouts and dropped connections are retried up
+        to ENGINE_MAX_RETRIES times, unless `retry` is False. The response of
+        the last attempt is yielded in any case, so the caller's status handling
+        stays the same; the error of the last attempt is raised.
+        """
+        endpoint = URL(url).path
+        max_retries = ENGINE_MAX_RETRIES if retry else 0
+        attempt = 0
+        while True:
+            error = None
+            async with self._slot():
+                self.requests += 1
+                start = time.monotonic()
+                try:
+                    response = await self.session.request(method, url, **kwargs)
+                except TRANSIENT_ERRORS as err:
+                    self.metrics.record(endpoint, "error", time.monotonic() - start)
+                    if attempt >= max_retries:
+                        raise
+                    error = err
+                except Exception:
+                    self.metrics.record(endpoint, "error", time.monotonic() - start)
+                    raise
+                else:
+                    latency = time.monotonic() - start
+                    delay = self._get_retry_delay(response, attempt, max_retries)
+                    if delay is None:
+                        size = 0
+                        try:
+                            yield response
+                            # The body is cached if the caller read it; otherwise
+                            # it is small enough to read for the byte count
+                            try:
+                                size = len(await response.read())
+                            except aiohttp.ClientError:
+                                pass
+                        finally:
+                            self.metrics.record(endpoint, response.status, latency, size)
+                            response.release()
+                        return
+                    self.metrics.record(endpoint, response.status, latency)
+                    response.release()
+
+            attempt += 1
+            self.retries += 1
+            if error is not None:
+                # Only this request is affected, so only this request waits
+                delay = self._get_backoff(attempt - 1)
+                _LOGGER.warning(
+                    f"Request to {endpoint} failed ({type(error).__name__}: {error}); "
+                    f"retrying in {delay:.1f}s (attempt {attempt}/{ENGINE_MAX_RETRIES})")
+                await asyncio.sleep(delay)
+                continue
+
+            # Everything this engine sends right now would most likely hit
+            # the same wall. Only throttling applies to the other accounts too;
+            # a server error may well be specific to this account.
+            self._bucket.block(delay)
+            if response.status == 429:
+                self.throttled += 1
+                if self._shared_bucket:
+                    self._shared_bucket.block(delay)
+            _LOGGER.warning(
+                f"Received status {response.status} from {endpoint}; "
+                f"retrying in {delay:.1f}s (attempt {attempt}/{ENGINE_MAX_RETRIES})")
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Wait for a free concurrency slot and a rate token."""
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        try:
+            await self._acquire_token()
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+        finally:
+            self._semaphore.release()
+
+    async def _acquire_token(self) -> None:
+        """Take one token from this engine's bucket and one from the shared one."""
+        await self._bucket.acquire()
+        if self._shared_bucket:
+            await self._shared_bucket.acquire()
+
+    def _get_retry_delay(self, response: aiohttp.ClientResponse, attempt: int, max_retries: int) -> float | None:
+        """Return the delay before retrying the request, or None if it should not be retried."""
+        if response.status != 429 and response.status < 500:
+            return None
+        if attempt >= max_retries:
+            return None
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return min(retry_after, ENGINE_BACKOFF_MAX)
+        return self._get_backoff(attempt)
+
+    def _get_backoff(self, attempt: int) -> float:
+        """Return the exponential backoff before retry number `attempt + 1`, with jitter."""
+        backoff = min(ENGINE_BACKOFF_BASE * 2 ** attempt, ENGINE_BACKOFF_MAX)
+        # Spread the retries, so requests that failed together don't retry together
+        return backoff / 2 + random.uniform(0, backoff / 2)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse the value of a Retry-After header.
+
+    Args:
+        value (str): Either a number of seconds or an HTTP date.
+
+    Returns:
+        float: The number of seconds to wait, None if the value is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class STFSessionManager:
+    """
+    Owns the CSRF token of a config entry and sends requests that need it.
+
+    - The token is fetched on first use and renewed once it gets older than
+      CSRF_RENEW_AFTER, before the server would reject it.
+    - If a request is rejected because of a stale token, the token is
+      refreshed and the request is sent once more. When several requests
+      fail at the same time, only the first one refreshes the token
+      (single-flight); the others wait for it and reuse the new token.
+    - Only if no new token can be fetched, ConfigEntryAuthFailed is raised
+      and the user has to reauthenticate.
+
+    It also keeps track of when the server session was last seen alive and
+    when it was found expired, and can ping chkLogin.do as a heartbeat to
+    keep the session from timing out between polls.
+    """
+
+    def __init__(self, engine: STFRequestEngine):
+        """Initialize the manager with the request engine of the config entry."""
+        self.engine = engine
+        self._token: str | None = None
+        self._token_fetched_at = 0.0
+        # Incremented on every refresh, so concurrent failures of requests
+        # sent with the same token trigger only one refresh
+        self._generation = 0
+        self._refresh_lock = asyncio.Lock()
+        self.token_refreshes = 0
+        self.replays = 0
+        self.heartbeats = 0
+        # Last time a request proved the session valid (monotonic and UTC)
+        self._last_alive = 0.0
+        self.last_alive_at: datetime | None = None
+        # When and where the session was found expired
+        self.expired_at: datetime | None = None
+        self.expired_during: str | None = None
+
+    @property
+    def closed(self) -> bool:
+        return self.engine.closed
+
+    async def close(self) -> None:
+        await self.engine.close()
+
+    def stats(self) -> dict:
+        """Return the counters of the request engine and the token."""
+        return self.engine.stats() | {
+            "token_age": round(time.monotonic() - self._token_fetched_at) if self._token else None,
+            "token_refreshes": self.token_refreshes,
+            "replays": self.replays,
+        }
+
+    def session_info(self) -> dict:
+        """Return what was observed about the server session's lifetime."""
+        return {
+            "last_alive_at": self.last_alive_at.isoformat() if self.last_alive_at else None,
+            "expired_at": self.expired_at.isoformat() if self.expired_at else None,
+            "expired_during": self.expired_during,
+            "heartbeats": self.heartbeats,
+        }
+
+    def _mark_alive(self) -> None:
+        self._last_alive = time.monotonic()
+        self.last_alive_at = datetime.now(timezone.utc)
+
+    def _mark_expired(self, during: str) -> None:
+        if self.expired_at is None:
+            self.expired_at = datetime.now(timezone.utc)
+            self.expired_during = during
+
+    async def async_heartbeat(self, interval: float) -> None:
+        """
+        Keep the server session alive by fetching a new CSRF token.
+
+        Nothing is sent if another request proved the session valid within
+        the last `interval` seconds.
+
+        Args:
+            interval (float): Heartbeat interval in seconds.
+
+        Raises:
+            ConfigEntryAuthFailed: If the session is not valid anymore.
+        """
+        if time.monotonic() - self._last_alive < interval:
+            return
+        self.heartbeats += 1
+        await self.async_refresh_token(during="heartbeat")
+
+    async def async_get_token(self) -> str:
+        """Return a valid CSRF token, fetching or renewing it if necessary."""
+        if self._token is None or time.monotonic() - self._token_fetched_at > CSRF_RENEW_AFTER.total_seconds():
+            await self.async_refresh_token(self._generation)
+        return self._token
+
+    async def async_refresh_token(self, generation: int | None = None, during: str = "request") -> None:
+        """
+        Fetch a new CSRF token.
+
+        Args:
+            generation (int): Generation of the token that was found stale. If
+                the token was refreshed since, nothing is done.
+            during (str): What the token is fetched for, recorded if the
+                session turns out to be expired.
+
+        Raises:
+            ConfigEntryAuthFailed: If the session is not valid anymore.
+        """
+        async with self._refresh_lock:
+            if generation is not None and generation != self._generation:
+                return
+            try:
+                self._token = await fetch_csrf(self.engine)
+            except ConfigEntryAuthFailed:
+                self._mark_expired(during)
+                raise
+            self._token_fetched_at = time.monotonic()
+            self._mark_alive()
+            self._generation += 1
+            self.token_refreshes += 1
+
+    @asynccontextmanager
+    async def post(self, url: str, retry: bool = True, **kwargs):
+        """
+        Send a POST request with the CSRF token and yield the response.
+
+        If the response indicates a stale token, the token is refreshed and
+        the request is replayed once; the server rejected the request, so
+        this is safe even with `retry=False`, which only turns off the retries
+        of the engine. The response of the last attempt is yielded, so the
+        caller's status handling stays the same.
+        """
+        for attempt in range(2):
+            token = await self.async_get_token()
+            generation = self._generation
+            async with self.engine.post(f"{url}?_csrf={token}", retry=retry, **kwargs) as response:
+                rejected = await _is_token_rejected(response)
+                if not rejected and response.status == 200:
+                    self._mark_alive()
+                if attempt > 0 or not rejected:
+                    if rejected:
+                        self._mark_expired(response.url.path)
+                    yield response
+                    return
+            _LOGGER.info(f"Request to {response.url.path} was rejected ({response.status}); refreshing CSRF token")
+            await self.async_refresh_token(generation)
+            self.replays += 1
+
+
+async def _is_token_rejected(response: aiohttp.ClientResponse) -> bool:
+    """Return True if STF rejected the request because of the session or CSRF token."""
+    if response.status in (401, 403, 404):
+        return True
+    if response.status != 200:
+        # The body is cached by aiohttp, so the caller can still read it
+        return await response.text() == 'Logout'
+    return False
+
 def get_login_url() -> str:
     """
     Generate the Samsung OAuth2 login URL for SmartThings Find.
@@ -77,7 +537,7 @@ def get_login_url() -> str:
         f"&locale=en-GB"
     )
 
-async def fetch_csrf(hass: HomeAssistant, session: aiohttp.ClientSession, entry_id: str):
+async def fetch_csrf(session: STFRequestEngine) -> str:
     """
     Retrieves the _csrf-Token which needs to be sent with each following request.
 
@@ -85,8 +545,10 @@ async def fetch_csrf(hass: HomeAssistant, session: aiohttp.ClientSession, entry_
     The JSESSIONID must already be present as a cookie in the session at this point.
 
     Args:
-        hass (HomeAssistant): Home Assistant instance.
-        session (aiohttp.ClientSession): The current session.
+        session (STFRequestEngine): The request engine of the config entry.
+
+    Returns:
+        str: The CSRF token.
 
     Raises:
         ConfigEntryAuthFailed: If the CSRF token is not found or if the authentication fails.
@@ -96,9 +558,8 @@ async def fetch_csrf(hass: HomeAssistant, session: aiohttp.ClientSession, entry_
         if response.status == 200:
             csrf_token = response.headers.get("_csrf")
             if csrf_token:
-                hass.data[DOMAIN][entry_id]["_csrf"] = csrf_token
                 _LOGGER.info("Successfully fetched new CSRF Token")
-                return
+                return csrf_token
             else:
                 err_msg = f"CSRF token not found in response headers. Status Code: {response.status}, Response: '{await response.text()}'"
                 _LOGGER.error(err_msg)
@@ -110,19 +571,19 @@ async def fetch_csrf(hass: HomeAssistant, session: aiohttp.ClientSession, entry_
 
     raise ConfigEntryAuthFailed(err_msg)
 
-async def get_devices(hass: HomeAssistant, session: aiohttp.ClientSession, entry_id: str) -> list:
+async def get_devices(hass: HomeAssistant, session: STFSessionManager, keep_raw: bool = False) -> list[DeviceDescriptor]:
     """
     Sends a request to the SmartThings Find API to retrieve a list of devices associated with the user's account.
 
     Args:
         hass (HomeAssistant): Home Assistant instance.
-        session (aiohttp.ClientSession): The current session.
+        session (STFSessionManager): The session manager of the config entry.
+        keep_raw (bool): Keep the full device list entry in each descriptor.
 
     Returns:
-        list: A list of devices if successful, empty list otherwise.
+        list: A list of DeviceDescriptor if successful, empty list otherwise.
     """
-    url = f"{URL_DEVICE_LIST}?_csrf={hass.data[DOMAIN][entry_id]['_csrf']}"
-    async with session.post(url, headers={'Accept': 'application/json'}, data={}) as response:
+    async with session.post(URL_DEVICE_LIST, headers={'Accept': 'application/json'}, data={}) as response:
         if response.status != 200:
             _LOGGER.error(f"Failed to retrieve devices [{response.status}]: {await response.text()}")
             if response.status == 404:
@@ -134,294 +595,195 @@ async def get_devices(hass: HomeAssistant, session: aiohttp.ClientSession, entry
         response_json = await response.json()
         devices_data = response_json["deviceList"]
         devices = []
+        dev_reg = device_registry.async_get(hass)
         for device in devices_data:
             # Double unescaping required. Example:
             # "Benedev&amp;#39;s S22" first becomes "Benedev&#39;s S22" and then "Benedev's S22"
             device['modelName'] = html.unescape(
                 html.unescape(device['modelName']))
-            identifier = (DOMAIN, device['dvceID'])
-            ha_dev = device_registry.async_get(
-                hass).async_get_device({identifier})
+            ha_dev = dev_reg.async_get_device({(DOMAIN, device['dvceID'])})
             if ha_dev and ha_dev.disabled:
                 _LOGGER.debug(
                     f"Ignoring disabled device: '{device['modelName']}' (disabled by {ha_dev.disabled_by})")
                 continue
-            ha_dev_info = DeviceInfo(
-                identifiers={identifier},
-                manufacturer="Samsung",
-                name=device['modelName'],
-                model=device['modelID'],
-                configuration_url="https://smartthingsfind.samsung.com/"
-            )
-            devices += [{"data": device, "ha_dev_info": ha_dev_info}]
+            devices += [create_device_descriptor(device, keep_raw)]
             _LOGGER.debug(f"Adding device: {device['modelName']}")
         return devices
 
-async def get_device_location(hass: HomeAssistant, session: aiohttp.ClientSession, dev_data: dict, entry_id: str) -> dict:
+def create_device_descriptor(data: dict, keep_raw: bool = False) -> DeviceDescriptor:
     """
-    Sends requests to update the device's location and retrieves the current location data for the specified device.
+    Creates the descriptor of a device, including its Home Assistant device info.
+
+    Args:
+        data (dict): An entry of the device list (or DeviceDescriptor.to_storage).
+        keep_raw (bool): Keep the full device list entry in the descriptor.
+
+    Returns:
+        DeviceDescriptor: The device descriptor.
+    """
+    ha_dev_info = DeviceInfo(
+        identifiers={(DOMAIN, data['dvceID'])},
+        manufacturer="Samsung",
+        name=data['modelName'],
+        model=data.get('modelID'),
+        configuration_url="https://smartthingsfind.samsung.com/"
+    )
+    return DeviceDescriptor.from_api(data, ha_dev_info, keep_raw)
+
+def is_active_mode(hass: HomeAssistant, device: DeviceDescriptor, entry_id: str) -> bool:
+    """
+    Returns whether a location update should be requested from the device before fetching it.
 
     Args:
         hass (HomeAssistant): Home Assistant instance.
-        session (aiohttp.ClientSession): The current session.
-        dev_data (dict): The device information obtained from get_devices.
+        device (DeviceDescriptor): The device as obtained from get_devices.
 
     Returns:
-        dict: The device location data.
+        bool: True if active mode is enabled for the device's type.
     """
-    dev_id = dev_data['dvceID']
-    dev_name = dev_data['modelName']
+    if device.type_code == 'TAG':
+        return hass.data[DOMAIN][entry_id][CONF_ACTIVE_MODE_SMARTTAGS]
+    return hass.data[DOMAIN][entry_id][CONF_ACTIVE_MODE_OTHERS]
 
-    set_last_payload = {
-        "dvceId": dev_id,
-        "removeDevice": []
-    }
+async def request_location_update(session: STFSessionManager, device: DeviceDescriptor) -> bool:
+    """
+    Asks the device to report its current location (active mode).
+
+    The device needs some time to answer, the new location can be fetched with
+    get_device_location afterwards.
 
+    Args:
+        session (STFSessionManager): The session manager of the config entry.
+        device (DeviceDescriptor): The device as obtained from get_devices.
+
+    Returns:
+        bool: True if the request was accepted.
+
+    Raises:
+        ConfigEntryAuthFailed: If the session is not valid anymore.
+    """
+    dev_name = device.name
     update_payload = {
-        "dvceId": dev_id,
+        "dvceId": device.dev_id,
         "operation": "CHECK_CONNECTION_WITH_LOCATION",
-        "usrId": dev_data['usrId']
+        "usrId": device.usr_id
     }
 
-    csrf_token = hass.data[DOMAIN][entry_id]["_csrf"]
-
     try:
-        active = (
-            (dev_data['deviceTypeCode'] == 'TAG' and hass.data[DOMAIN][entry_id][CONF_ACTIVE_MODE_SMARTTAGS]) or
-            (dev_data['deviceTypeCode'] != 'TAG' and hass.data[DOMAIN]
-             [entry_id][CONF_ACTIVE_MODE_OTHERS])
-        )
-
-        if active:
-            _LOGGER.debug("Active mode; requesting location update now")
-            async with session.post(f"{URL_REQUEST_LOC_UPDATE}?_csrf={csrf_token}", json=update_payload) as response:
-                # _LOGGER.debug(f"[{dev_name}] Update request response ({response.status}): {await response.text()}")
-                pass
-        else:
-            _LOGGER.debug("Passive mode; not requesting location update")
+        # Every request makes the device report its location, so it is never resent
+        async with session.post(URL_REQUEST_LOC_UPDATE, json=update_payload, retry=False) as response:
+            if response.status == 200:
+                _LOGGER.debug(f"[{dev_name}] Requested location update")
+                return True
+            _LOGGER.warning(
+                f"[{dev_name}] Failed to request location update ({response.status})")
+    except ConfigEntryAuthFailed:
+        raise
+    except Exception as e:
+        _LOGGER.error(
+            f"[{dev_name}] Exception occurred while requesting location update: {e}", exc_info=True)
+    return False
+
+async def get_device_location(session: STFSessionManager, device: DeviceDescriptor, keep_raw: bool = False,
+                              all_fixes: bool = False, fixes_after: datetime | None = None) -> DeviceResult:
+    """
+    Retrieves the current location data for the specified device.
 
-        async with session.post(f"{URL_SET_LAST_DEVICE}?_csrf={csrf_token}", json=set_last_payload, headers={'Accept': 'application/json'}) as response:
+    This only reads the location stored in STF. To get a fresh location, call
+    request_location_update first and give the device some time to answer.
+
+    Args:
+        session (STFSessionManager): The session manager of the config entry.
+        device (DeviceDescriptor): The device as obtained from get_devices.
+        keep_raw (bool): Keep the raw operations in the result.
+        all_fixes (bool): Return all distinct fixes of the response in the result, not only the newest.
+        fixes_after (datetime | None): Only return the fixes newer than this date (see parse_operations).
+
+    Returns:
+        DeviceResult: The parsed device location data.
+    """
+    dev_id = device.dev_id
+    dev_name = device.name
+
+    set_last_payload = {
+        "dvceId": dev_id,
+        "removeDevice": []
+    }
+
+    try:
+        async with session.post(URL_SET_LAST_DEVICE, json=set_last_payload, headers={'Accept': 'application/json'}) as response:
             _LOGGER.debug(
                 f"[{dev_name}] Location response ({response.status})")
             if response.status == 200:
                 data = await response.json()
-                res = {
-                    "dev_name": dev_name,
-                    "dev_id": dev_id,
-                    "update_success": True,
-                    "location_found": False,
-                    "used_op": None,
-                    "used_loc": None,
-                    "ops": []
-                }
-                used_loc = None
-                if 'operation' in data and len(data['operation']) > 0:
-                    res['ops'] = data['operation']
-
-                    used_op = None
-                    used_loc = {
-                        "latitude": None,
-                        "longitude": None,
-                        "gps_accuracy": None,
-                        "gps_date": None
-                    }
-                    # Find and extract the latest location from the response. Often the response
-                    # contains multiple locations (especially for non-SmartTag devices such as phones).
-                    # We go through all of them and find the "most usable" one. Sometimes locations
-                    # are encrypted (usually OFFLINE_LOC), we ignore these. They could probably also
-                    # be encrypted; there is a special getEncToken-Endpoint which returns some sort of
-                    # key. Since the only encrypted locations I encountered were even older than the
-                    # non encrypted ones, I didn't try anything to encrypt them yet.
-                    for op in data['operation']:
-                        if op['oprnType'] in ['LOCATION', 'LASTLOC', 'OFFLINE_LOC']:
-                            if 'latitude' in op:
-                                utcDate = None
-
-                                if 'extra' in op and 'gpsUtcDt' in op['extra']:
-                                    utcDate = parse_stf_date(
-                                        op['extra']['gpsUtcDt'])
-                                else:
-                                    _LOGGER.error(
-                                        f"[{dev_name}] No UTC date found for operation '{op['oprnType']}', this should not happen! OP: {json.dumps(op)}")
-                                    continue
-
-                                if used_loc['gps_date'] and used_loc['gps_date'] >= utcDate:
-                                    _LOGGER.debug(
-                                        f"[{dev_name}] Ignoring location older than the previous ({op['oprnType']})")
-                                    continue
-
-                                used_loc['latitude'] = float(op['latitude'])
-                                if 'longitude' in op:
-                                    used_loc['longitude'] = float(
-                                        op['longitude'])
-                                res['location_found'] = True
-
-                                used_loc['gps_accuracy'] = calc_gps_accuracy(
-                                    op.get('horizontalUncertainty'), op.get('verticalUncertainty'))
-                                used_loc['gps_date'] = utcDate
-                                used_op = op
-
-                            elif 'encLocation' in op:
-                                loc = op['encLocation']
-                                if 'encrypted' in loc and loc['encrypted']:
-                                    _LOGGER.info(
-                                        f"[{dev_name}] Ignoring encrypted location ({op['oprnType']})")
-                                    continue
-                                elif 'gpsUtcDt' not in loc:
-                                    _LOGGER.info(
-                                        f"[{dev_name}] Ignoring location with missing date ({op['oprnType']})")
-                                    continue
-                                else:
-                                    utcDate = parse_stf_date(loc['gpsUtcDt'])
-                                    if used_loc['gps_date'] and used_loc['gps_date'] >= utcDate:
-                                        _LOGGER.debug(
-                                            f"[{dev_name}] Ignoring location older than the previous ({op['oprnType']})")
-                                        continue
-                                    else:
-                                        locFound = False
-                                        if 'latitude' in loc:
-                                            used_loc['latitude'] = float(
-                                                loc['latitude'])
-                                            locFound = True
-                                        if 'longitude' in loc:
-                                            used_loc['longitude'] = float(
-                                                loc['longitude'])
-                                            locFound = True
-
-                                        if not locFound:
-                                            _LOGGER.warning(
-                                                f"[{dev_name}] Found no coordinates in operation '{op['oprnType']}'")
-                                        else:
-                                            res['location_found'] = True
-
-                                        used_loc['gps_accuracy'] = calc_gps_accuracy(
-                                            loc.get('horizontalUncertainty'), loc.get('verticalUncertainty'))
-                                        used_loc['gps_date'] = utcDate
-                                        used_op = op
-                                    continue
-
-                    if used_op:
-                        res['used_op'] = used_op
-                        res['used_loc'] = used_loc
-                    else:
-                        _LOGGER.warning(
-                            f"[{dev_name}] No useable location-operation found")
-
-                    _LOGGER.debug(
-                        f"    --> {dev_name} used operation: {'NONE' if not used_op else used_op['oprnType']}")
-
-                else:
+                ops = data.get('operation') or []
+                if not ops:
                     _LOGGER.warning(
                         f"[{dev_name}] No operation found in response; marking update failed")
-                    res['update_success'] = False
-                return res
+                    return DeviceResult(dev_id=dev_id, dev_name=dev_name)
+
+                parsed = parse_operations(dev_name, ops, all_fixes, fixes_after)
+                if not parsed.used_op:
+                    _LOGGER.warning(
+                        f"[{dev_name}] No useable location-operation found")
+                _LOGGER.debug(
+                    f"    --> {dev_name} used operation: {'NONE' if not parsed.used_op else parsed.used_op['oprnType']}")
+
+                return DeviceResult(
+                    dev_id=dev_id,
+                    dev_name=dev_name,
+                    update_success=True,
+                    fetched_at=datetime.now(timezone.utc),
+                    location=parsed.location,
+                    battery=parsed.battery,
+                    sub_locations=parsed.sub_locations,
+                    fixes=parsed.fixes,
+                    used_op_type=parsed.used_op['oprnType'] if parsed.used_op else None,
+                    used_op=parsed.used_op if keep_raw else None,
+                    ops=ops if keep_raw else None,
+                )
             else:
                 _LOGGER.error(
                     f"[{dev_name}] Failed to fetch device data ({response.status})")
                 res_text = await response.text()
                 _LOGGER.debug(f"[{dev_name}] Full response: '{res_text}'")
 
-                # Our session is not valid anymore. Refreshing the CSRF Token ist not
-                # enough at this point. Instead we have to ask the user to  go through
-                # the whole auth flow again
+                # Our session is not valid anymore. The session manager already
+                # retried with a fresh CSRF Token, so we have to ask the user to go
+                # through the whole auth flow again
                 if res_text == 'Logout' or response.status == 401:
                     raise ConfigEntryAuthFailed(
                         f"Session not valid anymore, received status_code of {response.status} with response '{res_text}'")
 
     except ConfigEntryAuthFailed as e:
         raise
+    except TRANSIENT_ERRORS as e:
+        # Errors of the request itself were already retried by the request
+        # engine; errors while reading the body (after the engine yielded the
+        # response) weren't, the device is simply polled again next cycle
+        _LOGGER.warning(
+            f"[{dev_name}] Failed to fetch location data ({type(e).__name__}: {e})")
     except Exception as e:
         _LOGGER.error(
             f"[{dev_name}] Exception occurred while fetching location data for tag '{dev_name}': {e}", exc_info=True)
 
-    return {
-        "dev_name": dev_name,
-        "dev_id": dev_id,
-        "update_success": False,
-        "location_found": False,
-        "used_op": None,
-        "used_loc": None,
-        "ops": []
-    }
+    return DeviceResult(dev_id=dev_id, dev_name=dev_name)
 
-def calc_gps_accuracy(hu: float, vu: float) -> float:
+def calc_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
-    Calculate the GPS accuracy using the Pythagorean theorem.
-    Returns the combined GPS accuracy based on the horizontal
-    and vertical uncertainties provided by the API
+    Calculate the great-circle distance between two coordinates
+    using the haversine formula.
 
     Args:
-        hu (float): Horizontal uncertainty.
-        vu (float): Vertical uncertainty.
+        lat1 (float): Latitude of the first point.
+        lon1 (float): Longitude of the first point.
+        lat2 (float): Latitude of the second point.
+        lon2 (float): Longitude of the second point.
 
     Returns:
-        float: Calculated GPS accuracy.
-    """
-    try:
-        return round((float(hu)**2 + float(vu)**2) ** 0.5, 1)
-    except ValueError:
-        return None
-
-def get_sub_location(ops: list, subDeviceName: str) -> tuple:
+        float: Distance in meters.
     """
-    Extracts sub-location data for devices that contain multiple
-    sub-locations (e.g., left and right earbuds).
-
-    Args:
-        ops (list): List of operations from the API.
-        subDeviceName (str): Name of the sub-device.
-
-    Returns:
-        tuple: The operation and sub-location data.
-    """
-    if not ops or not subDeviceName or len(ops) < 1:
-        return {}, {}
-    for op in ops:
-        if subDeviceName in op.get('encLocation', {}):
-            loc = op['encLocation'][subDeviceName]
-            sub_loc = {
-                "latitude": float(loc['latitude']),
-                "longitude": float(loc['longitude']),
-                "gps_accuracy": calc_gps_accuracy(loc.get('horizontalUncertainty'), loc.get('verticalUncertainty')),
-                "gps_date": parse_stf_date(loc['gpsUtcDt'])
-            }
-            return op, sub_loc
-    return {}, {}
-
-def parse_stf_date(datestr: str) -> datetime:
-    """
-    Parses a date string in the format "%Y%m%d%H%M%S" to a datetime object.
-    This is the format, the SmartThings Find API uses.
-
-    Args:
-        datestr (str): The date string in the format "%Y%m%d%H%M%S".
-
-    Returns:
-        datetime: A datetime object representing the input date string.
-    """
-    return datetime.strptime(datestr, "%Y%m%d%H%M%S").replace(tzinfo=pytz.UTC)
-
-def get_battery_level(dev_name: str, ops: list) -> int:
-    """
-    Try to extract the device battery level from the received operation
-
-    Args:
-        dev_name (str): The name of the device.
-        ops (list): List of operations from the API.
-
-    Returns:
-        int: The battery level if found, None otherwise.
-    """
-    for op in ops:
-        if op['oprnType'] == 'CHECK_CONNECTION' and 'battery' in op:
-            batt_raw = op['battery']
-            batt = BATTERY_LEVELS.get(batt_raw, None)
-            if batt is None:
-                try:
-                    batt = int(batt_raw)
-                except ValueError:
-                    _LOGGER.warning(
-                        f"[{dev_name}]: Received invalid battery level: {batt_raw}")
-            return batt
-    return None
-
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))